@@ -1,41 +1,42 @@
+import os
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
+import orjson
 from flask import Flask
-from controllers.content_generator_controller import content_bp
+from flask.json.provider import JSONProvider
 from mongoengine import connect
-from configuration.configuration import Configuration, logger
+from configuration.configuration import get_config, logger
+from models.models import ensure_indexes
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson, used by jsonify and request.json"""
 
-app = Flask(__name__)
+    options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
 
-# MongoDB configuration
-app.config['MONGODB_SETTINGS'] = {
-    'db': 'content_gen',
-    'host': Configuration.mongo_uri
-}
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, option=self.options).decode()
 
-try:
-    connect(**app.config['MONGODB_SETTINGS'])
-    logger.info("✅ MongoDB connected successfully")
-except Exception as e:
-    logger.error(f"❌ MongoDB connection failed: {e}")
-    raise
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
-# Register blueprints
-app.register_blueprint(content_bp)
+
+# CORS headers for development
+_CORS_HEADERS = (
+    ('Access-Control-Allow-Origin', '*'),
+    ('Access-Control-Allow-Headers', 'Content-Type,Authorization'),
+    ('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS'),
+)
 
 
-# Add CORS headers for development
-@app.after_request
 def after_request(response):
-    response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-    response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    response.headers.extend(_CORS_HEADERS)
     return response
 
 
-@app.route('/')
 def index():
     """Root endpoint with system information"""
     return {
@@ -50,6 +51,7 @@ def index():
             "generate_github": "/generate/github",
             "generate_text": "/generate/text",
             "generate_multiple": "/generate/multiple",
+            "generate_multiple_stream": "/generate/multiple/stream",
             "demo": "/demo"
         },
         "workflow": [
@@ -62,6 +64,45 @@ def index():
     }
 
 
+def create_app() -> Flask:
+    """
+    Build the app, connect MongoDB and register the routes.
+    Kept out of import time: spawned parser processes re-import this module and must not reconnect.
+    """
+    # The controller starts the shared event loop thread when imported
+    from controllers.content_generator_controller import content_bp
+
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    config = get_config()
+
+    # MongoDB configuration
+    app.config['MONGODB_SETTINGS'] = {
+        'db': 'content_gen',
+        'host': config.mongo_uri,
+        'maxPoolSize': config.mongo_max_pool_size,
+        'minPoolSize': config.mongo_min_pool_size,
+        'maxIdleTimeMS': config.mongo_max_idle_time_ms,
+        'waitQueueTimeoutMS': config.mongo_wait_queue_timeout_ms,
+        'serverSelectionTimeoutMS': config.mongo_server_selection_timeout_ms,
+        'retryWrites': True
+    }
+
+    try:
+        connect(**app.config['MONGODB_SETTINGS'])
+        ensure_indexes()
+        logger.info("✅ MongoDB connected successfully")
+    except Exception as e:
+        logger.error(f"❌ MongoDB connection failed: {e}")
+        raise
+
+    # Register blueprints
+    app.register_blueprint(content_bp)
+    app.after_request(after_request)
+    app.add_url_rule('/', view_func=index)
+    return app
+
+
 if __name__ == "__main__":
     logger.info("🚀 Starting Agentic Content Generation System")
     logger.info("📋 Available endpoints:")
@@ -73,6 +114,9 @@ if __name__ == "__main__":
     logger.info("   POST /generate/github  - Generate from GitHub")
     logger.info("   POST /generate/text    - Generate from text")
     logger.info("   POST /generate/multiple - Generate from multiple sources")
+    logger.info("   POST /generate/multiple/stream - Stream generation from multiple sources")
     logger.info("   POST /demo     - Demo generation")
 
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    logger.info("ℹ️ Development server only; in production run: gunicorn -c gunicorn_conf.py 'app:create_app()'")
+
+    create_app().run(debug=os.environ.get("FLASK_DEBUG") == "1", host='0.0.0.0', port=5000, threaded=True)
\ No newline at end of file
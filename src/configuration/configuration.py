@@ -1,32 +1,64 @@
 import os
 import logging
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Optional
 
-from dotenv import load_dotenv
 
-load_dotenv()
+def _env(name: str, default: str, cast: Callable = str):
+    """Dataclass field read from the environment when the instance is created"""
+    return field(default_factory=lambda: cast(os.environ.get(name, default)))
 
 
 @dataclass
 class Configuration:
-    output_dir: str = os.environ.get("OUTPUT_DIR", "./outputs")
-    max_concurrent_agents: int = int(os.environ.get("MAX_AGENTS", "2"))
-    embedding_model: str = os.environ.get("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
-    memory_db_path: str = os.environ.get("MEMORY_DB_PATH", "./memory_db")
-    chunk_size: int = int(os.environ.get("CHUNK_SIZE", "2000"))
-    chunk_overlap: int = int(os.environ.get("CHUNK_OVERLAP", "200"))
-    httrack_docker_image: str = os.environ.get("HTTRACK_IMAGE", "ralfbs/httrack:latest")
-    gemini_api_key: str = os.environ.get("GEMINI_API_KEY", "")
-    mongo_uri: str = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
+    output_dir: str = _env("OUTPUT_DIR", "./outputs")
+    max_concurrent_agents: int = _env("MAX_AGENTS", "2", int)
+    embedding_model: str = _env("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    memory_db_path: str = _env("MEMORY_DB_PATH", "./memory_db")
+    chunk_size: int = _env("CHUNK_SIZE", "2000", int)
+    chunk_overlap: int = _env("CHUNK_OVERLAP", "200", int)
+    crawl_concurrency: int = _env("CRAWL_CONCURRENCY", "16", int)
+    crawl_max_pages: int = _env("CRAWL_MAX_PAGES", "200", int)
+    crawl_max_page_bytes: int = _env("CRAWL_MAX_PAGE_BYTES", "5000000", int)
+    # Parser processes per app process; every gunicorn worker gets its own pool
+    crawl_parse_workers: int = _env("CRAWL_PARSE_WORKERS", "2", int)
+    gemini_api_key: str = _env("GEMINI_API_KEY", "")
+    github_token: str = _env("GITHUB_TOKEN", "")
+    mongo_uri: str = _env("MONGO_URI", "mongodb://localhost:27017/")
+
+    # MongoDB connection pool, per process: sized for gunicorn's WEB_THREADS (8) plus the background
+    # event loop and a small margin; the server sees this times the number of gunicorn workers
+    mongo_max_pool_size: int = _env("MONGO_MAX_POOL", "16", int)
+    mongo_min_pool_size: int = _env("MONGO_MIN_POOL", "2", int)
+    mongo_max_idle_time_ms: int = _env("MONGO_MAX_IDLE_MS", "300000", int)
+    mongo_wait_queue_timeout_ms: int = _env("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000", int)
+    mongo_server_selection_timeout_ms: int = _env("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000", int)
 
     # Quality thresholds
-    min_quality_score: float = float(os.environ.get("MIN_QUALITY_SCORE", "75.0"))
-    max_generation_iterations: int = int(os.environ.get("MAX_ITERATIONS", "3"))
+    min_quality_score: float = _env("MIN_QUALITY_SCORE", "75.0", float)
+    max_generation_iterations: int = _env("MAX_ITERATIONS", "3", int)
 
     # Content processing
-    min_content_length: int = int(os.environ.get("MIN_CONTENT_LENGTH", "500"))
-    max_context_tokens: int = int(os.environ.get("MAX_CONTEXT_TOKENS", "8000"))
+    min_content_length: int = _env("MIN_CONTENT_LENGTH", "500", int)
+    max_context_tokens: int = _env("MAX_CONTEXT_TOKENS", "8000", int)
+
+    # LLM response caching
+    semantic_cache_threshold: float = _env("SEMANTIC_CACHE_THRESHOLD", "0.95", float)
+    semantic_cache_ttl_seconds: float = _env("SEMANTIC_CACHE_TTL", "86400", float)
+    plan_cache_threshold: float = _env("PLAN_CACHE_THRESHOLD", "0.92", float)
+    plan_cache_ttl_seconds: float = _env("PLAN_CACHE_TTL", "600", float)
+
+    # Gemini call timeouts (short calls / full generations), retries on timeout or rate limiting,
+    # and the cap on concurrent calls across agents
+    gemini_timeout_s: float = _env("GEMINI_TIMEOUT", "15", float)
+    gemini_generation_timeout_s: float = _env("GEMINI_GENERATION_TIMEOUT", "120", float)
+    gemini_max_retries: int = _env("GEMINI_MAX_RETRIES", "2", int)
+    gemini_rate_limit_retries: int = _env("GEMINI_RATE_LIMIT_RETRIES", "4", int)
+    gemini_max_concurrency: int = _env("GEMINI_MAX_CONCURRENCY", "8", int)
+
+    # Longest wait on a Gemini batch job before it is cancelled and callers fall back
+    gemini_batch_max_wait_s: float = _env("GEMINI_BATCH_MAX_WAIT", "3600", float)
 
     def validate(self) -> bool:
         """Validate configuration settings"""
@@ -39,6 +71,12 @@ class Configuration:
         return True
 
 
+@lru_cache(maxsize=1)
+def get_config() -> Configuration:
+    """Parse the environment once and return the shared configuration"""
+    return Configuration()
+
+
 # --- Logging setup ---
 logger = logging.getLogger("agentic")
 logger.setLevel(logging.INFO)
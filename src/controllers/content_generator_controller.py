@@ -1,25 +1,78 @@
 import asyncio
-from flask import Blueprint, request, jsonify
-from services.content_generator import ContentGeneratorService
+import atexit
+import threading
+import orjson
+from flask import Blueprint, Response, abort, request, jsonify, stream_with_context
 from configuration.configuration import logger
 
 content_bp = Blueprint("content", __name__)
-service = ContentGeneratorService()
+_service = None
+_service_lock = threading.Lock()
+_shutdown_done = threading.Event()
+
+# Single long-lived event loop shared by all requests, so async resources
+# (orchestrator workers, HTTP sessions, Gemini streams) survive between calls.
+_loop = asyncio.new_event_loop()
+threading.Thread(target=_loop.run_forever, name="content-event-loop", daemon=True).start()
+
+
+def _svc():
+    """Build the content generator service on first use"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                from services.content_generator import ContentGeneratorService
+                _service = ContentGeneratorService()
+    return _service
+
+
+def _json() -> dict:
+    """Parse the request body with orjson without caching the raw bytes on the request"""
+    raw = request.get_data(cache=False)
+    if not raw:
+        return {}
+    try:
+        return orjson.loads(raw) or {}
+    except orjson.JSONDecodeError:
+        abort(400, description="Invalid JSON body")
+
+
+def _run(coro):
+    """Run a coroutine on the background event loop and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(coro, _loop).result()
+
+
+def _sse(stream):
+    """Relay an async text stream from the background loop as server-sent events"""
+    try:
+        while True:
+            try:
+                text = _run(stream.__anext__())
+            except StopAsyncIteration:
+                break
+            yield "".join(f"data: {line}\n" for line in text.split("\n")) + "\n"
+        yield "event: done\ndata: \n\n"
+    except Exception as e:
+        logger.error(f"❌ Streaming generation failed: {e}")
+        yield f"event: error\ndata: {e}\n\n"
+    finally:
+        _run(stream.aclose())
 
 
 @content_bp.route("/health", methods=["GET"])
 def health_check():
     """Health check endpoint"""
     try:
-        stats = service.get_system_stats()
+        stats = _svc().get_system_stats()
         return jsonify({
             "status": "healthy",
             "service": "Agentic Content Generation System",
             "version": "1.0.0",
             "agents_active": len([agent for agent, status in stats["agent_status"].items() if status != "error"]),
             "memory_stats": stats["memory_stats"],
-            "supported_content_types": service.get_supported_content_types(),
-            "supported_source_types": service.get_supported_source_types()
+            "supported_content_types": _svc().get_supported_content_types(),
+            "supported_source_types": _svc().get_supported_source_types()
         })
     except Exception as e:
         return jsonify({"status": "unhealthy", "error": str(e)}), 500
@@ -29,7 +82,7 @@ def health_check():
 def get_configuration():
     """Get system configuration"""
     try:
-        config = service.get_configuration()
+        config = _svc().get_configuration()
         return jsonify({
             "status": "success",
             "configuration": config
@@ -42,7 +95,7 @@ def get_configuration():
 def get_system_stats():
     """Get comprehensive system statistics"""
     try:
-        stats = service.get_system_stats()
+        stats = _svc().get_system_stats()
         return jsonify({
             "status": "success",
             "statistics": stats
@@ -54,7 +107,7 @@ def get_system_stats():
 @content_bp.route("/generate/website", methods=["POST"])
 def generate_from_website():
     """Generate content from website source"""
-    data = request.json or {}
+    data = _json()
     url = data.get("url")
     topic = data.get("topic")
     content_type = data.get("content_type", "tutorial")
@@ -66,7 +119,7 @@ def generate_from_website():
     logger.info(f"🌐 Website generation request: {url} -> {content_type}")
 
     try:
-        result = asyncio.run(service.generate_from_website(
+        result = _run(_svc().generate_from_website(
             url=url,
             topic=topic,
             content_type=content_type,
@@ -84,7 +137,7 @@ def generate_from_website():
 @content_bp.route("/generate/github", methods=["POST"])
 def generate_from_github():
     """Generate content from GitHub repository"""
-    data = request.json or {}
+    data = _json()
     repo_url = data.get("repo_url")
     topic = data.get("topic")
     content_type = data.get("content_type", "tutorial")
@@ -95,7 +148,7 @@ def generate_from_github():
     logger.info(f"📁 GitHub generation request: {repo_url} -> {content_type}")
 
     try:
-        result = asyncio.run(service.generate_from_github(
+        result = _run(_svc().generate_from_github(
             repo_url=repo_url,
             topic=topic,
             content_type=content_type,
@@ -112,7 +165,7 @@ def generate_from_github():
 @content_bp.route("/generate/text", methods=["POST"])
 def generate_from_text():
     """Generate content from text input"""
-    data = request.json or {}
+    data = _json()
     content = data.get("content")
     topic = data.get("topic")
     content_type = data.get("content_type", "tutorial")
@@ -123,7 +176,7 @@ def generate_from_text():
     logger.info(f"📝 Text generation request: {len(content or '')} chars -> {content_type}")
 
     try:
-        result = asyncio.run(service.generate_from_text(
+        result = _run(_svc().generate_from_text(
             content=content,
             topic=topic,
             content_type=content_type,
@@ -140,7 +193,7 @@ def generate_from_text():
 @content_bp.route("/generate/multiple", methods=["POST"])
 def generate_from_multiple_sources():
     """Generate content from multiple sources"""
-    data = request.json or {}
+    data = _json()
     sources = data.get("sources", [])
     topic = data.get("topic")
     content_type = data.get("content_type", "tutorial")
@@ -151,7 +204,7 @@ def generate_from_multiple_sources():
     logger.info(f"🔗 Multi-source generation request: {len(sources)} sources -> {content_type}")
 
     try:
-        result = asyncio.run(service.generate_from_multiple_sources(
+        result = _run(_svc().generate_from_multiple_sources(
             sources=sources,
             topic=topic,
             content_type=content_type,
@@ -165,11 +218,35 @@ def generate_from_multiple_sources():
         return jsonify({"error": str(e)}), 500
 
 
+@content_bp.route("/generate/multiple/stream", methods=["POST"])
+def stream_from_multiple_sources():
+    """Stream generated content from multiple sources as server-sent events"""
+    data = _json()
+    sources = data.get("sources", [])
+    topic = data.get("topic")
+    content_type = data.get("content_type", "tutorial")
+    audience_level = data.get("audience_level", "intermediate")
+    tone = data.get("tone", "conversational")
+    constraints = data.get("constraints", {})
+
+    logger.info(f"🔗 Streamed multi-source generation request: {len(sources)} sources -> {content_type}")
+
+    stream = _svc().stream_from_multiple_sources(
+        sources=sources,
+        topic=topic,
+        content_type=content_type,
+        audience_level=audience_level,
+        tone=tone,
+        constraints=constraints
+    )
+    return Response(stream_with_context(_sse(stream)), mimetype="text/event-stream")
+
+
 @content_bp.route("/task/<task_id>/status", methods=["GET"])
 def get_task_status(task_id: str):
     """Get status of a specific generation task"""
     try:
-        result = asyncio.run(service.get_task_status(task_id))
+        result = _run(_svc().get_task_status(task_id))
         return jsonify(result)
     except Exception as e:
         logger.error(f"❌ Task status check failed: {e}")
@@ -179,7 +256,7 @@ def get_task_status(task_id: str):
 @content_bp.route("/demo", methods=["POST"])
 def demo_generation():
     """Demo endpoint for testing the complete pipeline"""
-    data = request.json or {}
+    data = _json()
 
     # Demo configuration
     demo_config = {
@@ -210,7 +287,7 @@ def demo_generation():
     logger.info(f"🎯 Demo generation: {demo_config['topic']} -> {demo_config['content_type']}")
 
     try:
-        result = asyncio.run(service.generate_from_multiple_sources(**demo_config))
+        result = _run(_svc().generate_from_multiple_sources(**demo_config))
         return jsonify({
             "status": "success",
             "demo_config": demo_config,
@@ -222,15 +299,18 @@ def demo_generation():
         return jsonify({"error": str(e), "demo_config": demo_config}), 500
 
 
-@content_bp.record_once
-def setup(state):
-    """Setup teardown handler"""
-    app = state.app
+@atexit.register
+def shutdown():
+    """Shut the service down and stop the background event loop on process exit; runs once"""
+    if _shutdown_done.is_set():
+        return
+    _shutdown_done.set()
 
-    @app.teardown_appcontext
-    def shutdown(exception=None):
-        try:
-            asyncio.run(service.shutdown())
-            logger.info("✅ Service shutdown complete")
-        except Exception as e:
-            logger.error(f"❌ Error during shutdown: {e}")
\ No newline at end of file
+    try:
+        if _service is not None:
+            _run(_service.shutdown())
+        logger.info("✅ Service shutdown complete")
+    except Exception as e:
+        logger.error(f"❌ Error during shutdown: {e}")
+    finally:
+        _loop.call_soon_threadsafe(_loop.stop)
@@ -0,0 +1,26 @@
+import os
+import sys
+
+# Run from src/ with: gunicorn -c gunicorn_conf.py 'app:create_app()'
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", (os.cpu_count() or 2) * 2 + 1))
+threads = int(os.environ.get("WEB_THREADS", "8"))
+worker_class = "gthread"
+timeout = int(os.environ.get("WEB_TIMEOUT", "120"))
+
+# Each worker holds up to MONGO_MAX_POOL MongoDB connections (default 16, sized for 8 threads), so the
+# database sees workers x MONGO_MAX_POOL; raise both together when raising WEB_THREADS.
+
+# Each worker also owns a spawned HTML parser pool of CRAWL_PARSE_WORKERS processes (default 2),
+# so a box runs workers x CRAWL_PARSE_WORKERS parsers; keep that small when raising WEB_CONCURRENCY.
+
+# create_app() opens the MongoClient and starts the background event loop thread,
+# neither of which survives a fork, so each worker builds the app itself.
+preload_app = False
+
+
+def worker_exit(server, worker):
+    """Flush buffered writes and stop the event loop; atexit hooks do not run when a worker is killed on timeout"""
+    controller = sys.modules.get("controllers.content_generator_controller")
+    if controller is not None:
+        controller.shutdown()
@@ -1,23 +1,38 @@
 from datetime import datetime, timezone
 
+import numpy as np
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 from mongoengine import (
+    BinaryField,
     Document,
     StringField,
     EmailField,
     DateTimeField,
     ListField,
     DictField,
-    FloatField,
     IntField,
-    ReferenceField,
 )
-from werkzeug.security import generate_password_hash, check_password_hash
+from pymongo import ReplaceOne
+from pymongo.errors import OperationFailure
+from werkzeug.security import check_password_hash
 
 import utils.utils as utils
+from configuration.configuration import logger
+
+# Argon2id with OWASP-recommended minimum cost (19 MiB, 2 iterations, 1 lane)
+_password_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
+
+def _decode_embedding(value) -> np.ndarray:
+    """float32 vector from stored bytes, or from the float list written before embeddings were stored as bytes"""
+    if isinstance(value, (bytes, bytearray)):
+        return np.frombuffer(value, dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
 
 
 class User(Document):
-    meta = {"collection": "users"}
+    meta = {"collection": "users", "auto_create_index": False}
 
     id = StringField(primary_key=True, default=utils.generate_uuid)
     username = StringField(required=True, unique=True, max_length=50)
@@ -27,10 +42,16 @@ class User(Document):
     updated_at = DateTimeField(default=lambda: datetime.now(timezone.utc))
 
     def set_password(self, password: str):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = _password_hasher.hash(password)
 
     def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password_hash, password)
+        if not self.password_hash.startswith("$argon2"):
+            # Hashes created before the switch to Argon2
+            return check_password_hash(self.password_hash, password)
+        try:
+            return _password_hasher.verify(self.password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
 
     def to_dict(self) -> dict:
         return {
@@ -47,7 +68,11 @@ class User(Document):
 
 
 class SourceDocument(Document):
-    meta = {"collection": "documents"}
+    meta = {
+        "collection": "documents",
+        "auto_create_index": False,
+        "indexes": [("doc_type", "-created_at"), "url", "source"],
+    }
 
     id = StringField(primary_key=True, default=utils.generate_uuid)
     title = StringField(required=True, max_length=200)
@@ -72,35 +97,50 @@ class SourceDocument(Document):
 
 
 class ContentChunk(Document):
-    meta = {"collection": "content_chunks"}
+    meta = {
+        "collection": "content_chunks",
+        "auto_create_index": False,
+        "indexes": [("document_id", "chunk_index")],
+    }
 
     id = StringField(primary_key=True, default=utils.generate_uuid)
-    document = ReferenceField(SourceDocument, required=True, reverse_delete_rule=2)  # CASCADE
+    document_id = StringField(required=True, db_field="document")  # SourceDocument ID
     content = StringField(required=True)
     chunk_index = IntField(required=True)
-    embedding = ListField(FloatField())
+    embedding = BinaryField()  # float32 vector bytes
     metadata = DictField()
     created_at = DateTimeField(default=lambda: datetime.now(timezone.utc))
 
+    def set_embedding(self, vector) -> None:
+        self.embedding = np.asarray(vector, dtype=np.float32).tobytes()
+
+    def get_embedding(self) -> np.ndarray:
+        return _decode_embedding(self.embedding)
+
     def to_dict(self) -> dict:
         return {
             "id": self.id,
-            "document_id": str(self.document.id) if self.document else None,
+            "document_id": self.document_id,
             "content": self.content,
             "chunk_index": self.chunk_index,
-            "embedding": self.embedding,
+            "embedding": self.get_embedding().tolist() if self.embedding else [],
             "metadata": self.metadata,
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
 
 
 class GeneratedContent(Document):
-    meta = {"collection": "generated_content"}
+    meta = {
+        "collection": "generated_content",
+        "auto_create_index": False,
+        "indexes": [("content_type", "-created_at"), "title", "content_digest"],
+    }
 
     id = StringField(primary_key=True, default=utils.generate_uuid)
     title = StringField(required=True, max_length=200)
     content_type = StringField(required=True, choices=["youtube", "book", "tutorial", "interactive"])
     content = StringField(required=True)
+    content_digest = StringField()  # BLAKE2b of the content, to find repeated output
     source_documents = ListField(StringField())  # store document IDs
     metadata = DictField()
     created_at = DateTimeField(default=lambda: datetime.now(timezone.utc))
@@ -118,26 +158,43 @@ class GeneratedContent(Document):
 
 
 class Concept(Document):
-    meta = {"collection": "concepts"}
+    meta = {
+        "collection": "concepts",
+        "auto_create_index": False,
+        "indexes": ["name", "document_id"],
+    }
 
     id = StringField(primary_key=True, default=utils.generate_uuid)
     name = StringField(required=True, max_length=200)
     document_id = StringField()
-    embedding = ListField(FloatField())
+    embedding = BinaryField()  # float32 vector bytes
     created_at = DateTimeField(default=lambda: datetime.now(timezone.utc))
 
+    def set_embedding(self, vector) -> None:
+        self.embedding = np.asarray(vector, dtype=np.float32).tobytes()
+
+    def get_embedding(self) -> np.ndarray:
+        return _decode_embedding(self.embedding)
+
     def to_dict(self) -> dict:
         return {
             "id": self.id,
             "name": self.name,
             "document_id": self.document_id,
-            "embedding": self.embedding,
+            "embedding": self.get_embedding().tolist() if self.embedding else [],
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
 
 
 class Relationship(Document):
-    meta = {"collection": "relationships"}
+    meta = {
+        "collection": "relationships",
+        "auto_create_index": False,
+        "indexes": [
+            {"fields": ("concept1_id", "concept2_id", "relation_type"), "unique": True},
+            "concept2_id",
+        ],
+    }
 
     id = StringField(primary_key=True, default=utils.generate_uuid)
     concept1_id = StringField(required=True)
@@ -152,4 +209,39 @@ class Relationship(Document):
             "concept2_id": self.concept2_id,
             "relation_type": self.relation_type,
             "created_at": self.created_at.isoformat() if self.created_at else None,
-        }
\ No newline at end of file
+        }
+
+
+def ensure_indexes() -> None:
+    """Create indexes for all collections; called once at startup instead of on first query"""
+    for document_cls in (User, SourceDocument, ContentChunk, GeneratedContent, Concept):
+        document_cls.ensure_indexes()
+
+    # Databases written before the unique relationship index can hold duplicate edges that block building it
+    try:
+        _dedupe_relationships()
+        Relationship.ensure_indexes()
+    except OperationFailure as e:
+        logger.warning(f"⚠️ Unique relationship index not built, duplicate edges may still be written: {e}")
+
+
+def _dedupe_relationships() -> None:
+    """Keep one relationship per (concept1_id, concept2_id, relation_type), deleting the rest"""
+    collection = Relationship._get_collection()
+    duplicates = collection.aggregate([
+        {"$group": {"_id": {"c1": "$concept1_id", "c2": "$concept2_id", "type": "$relation_type"},
+                    "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ], allowDiskUse=True)
+    extra_ids = [doc_id for group in duplicates for doc_id in group["ids"][1:]]
+    if extra_ids:
+        collection.delete_many({"_id": {"$in": extra_ids}})
+        logger.info(f"🧹 Removed {len(extra_ids)} duplicate relationships before building the unique index")
+
+
+def bulk_save(documents: list) -> None:
+    """Upsert documents of a single model in one bulk write instead of one save() per document"""
+    if not documents:
+        return
+    operations = [ReplaceOne({"_id": son["_id"]}, son, upsert=True) for son in (doc.to_mongo() for doc in documents)]
+    type(documents[0])._get_collection().bulk_write(operations, ordered=False, bypass_document_validation=True)
@@ -1,9 +1,15 @@
-from .agents.generation_agent import GenerationAgent
-from .agents.ingestion_agent import IngestionAgent
-from .agents.quality_agent import QualityAgent
-from .agents.planning_agent import PlanningAgent
-from .base_agent import BaseAgent
-from .memory import AgentMemory
+import importlib
+
+# Agents pull in google.genai, sentence-transformers and friends, so they are
+# imported on first attribute access (PEP 562) rather than at package import.
+_LAZY_EXPORTS = {
+    "AgentMemory": ".memory",
+    "BaseAgent": ".base_agent",
+    "IngestionAgent": ".agents.ingestion_agent",
+    "GenerationAgent": ".agents.generation_agent",
+    "QualityAgent": ".agents.quality_agent",
+    "PlanningAgent": ".agents.planning_agent",
+}
 
 __all__ = [
     "AgentMemory",
@@ -13,3 +19,12 @@ __all__ = [
     "QualityAgent",
     "PlanningAgent",
 ]
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
@@ -1,105 +1,253 @@
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 import asyncio
-from datetime import datetime
+import hashlib
+import io
+import re
+from datetime import datetime, timezone
+from functools import lru_cache, partial
+from itertools import islice
+from types import MappingProxyType
 
 from services.base_agent import BaseAgent
 from services.memory import AgentMemory
+from services.gemini_client import get_gemini_client
+from services.semantic_cache import SemanticCache, cache_scope
 from configuration.configuration import Configuration as Config, logger
 from models.models import GeneratedContent
-from google import genai
 from google.genai import types
+from cachetools import TTLCache
+import numpy as np
+import tiktoken
+
+
+# System instructions are fixed per content type and shared by every request
+SYSTEM_INSTRUCTIONS = {
+    "youtube": "You are a YouTube content creator who makes engaging, educational videos. Use timing markers, visual cues, and conversational tone.",
+    "tutorial": "You are a technical writer creating step-by-step tutorials. Be clear, precise, and include practical examples.",
+    "book": "You are an educational author writing comprehensive book chapters. Maintain academic rigor while being accessible.",
+    "interactive": "You are an instructional designer creating interactive learning content with quizzes and exercises."
+}
+
+# Title prefixes per content type
+_TYPE_PREFIXES = {
+    "youtube": "Video:",
+    "tutorial": "Tutorial:",
+    "book": "Chapter:",
+    "interactive": "Interactive Guide:"
+}
+
+# Post-processing patterns: per-line edge whitespace (but not the newline), blank-line runs, words
+_WS_LINE_RE = re.compile(r"^[^\S\n]+|[^\S\n]+$", re.MULTILINE)
+_MULTI_NL_RE = re.compile(r"\n{3,}")
+_WORD_RE = re.compile(r"\S+")
+
+# Plan fields that shape the generated text; planning metadata (timestamps, cache flags) is left out of cache keys
+_PLAN_CACHE_FIELDS = ("outline", "objectives", "key_concepts", "structure_notes", "estimated_length")
+
+# Token budgets for the list sections of the generation prompt
+_MAX_OUTLINE_TOKENS = 500
+_MAX_OBJECTIVES_TOKENS = 300
+_MAX_RECOMMENDATIONS_TOKENS = 500
+
+
+@lru_cache(maxsize=1)
+def _get_token_encoding() -> tiktoken.Encoding:
+    """Load the BPE tokenizer used for context budgeting on first use"""
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def _write_bullets(w, items: list, max_tokens: int) -> None:
+    """Write '- item' lines until the section's token budget is spent"""
+    encoding = _get_token_encoding()
+    used = 0
+    for item in items:
+        line = f"- {item}\n"
+        used += len(encoding.encode_ordinary(line))
+        if used > max_tokens:
+            w("- … (truncated)\n")
+            break
+        w(line)
+
+
+def _build_prompt(header: str, suffix: str, topic: str, plan: dict, context: str, recommendations: list,
+                  audience_level: str, tone: str, constraints: dict) -> str:
+    """Build a generation prompt around a content type's fixed header and format suffix"""
+    buf = io.StringIO()
+    w = buf.write
+
+    w(f"{header}{topic}\n")
+    w(f"Target audience: {audience_level}\n")
+    w(f"Tone and style: {tone}\n\n")
+
+    # Add outline if available
+    if plan.get('outline'):
+        w("Content Structure:\n")
+        _write_bullets(w, plan['outline'], _MAX_OUTLINE_TOKENS)
+        w("\n")
+
+    # Add learning objectives
+    if plan.get('objectives'):
+        w("Learning Objectives:\n")
+        _write_bullets(w, plan['objectives'], _MAX_OBJECTIVES_TOKENS)
+        w("\n")
+
+    # Add context from sources
+    if context:
+        w("Reference Material:\n")
+        w(context[:4000])  # Limit context length
+        w("\n\n")
+
+    # Add improvement recommendations
+    if recommendations:
+        w("Improvement Guidelines:\n")
+        _write_bullets(w, recommendations, _MAX_RECOMMENDATIONS_TOKENS)
+        w("\n")
+
+    # Add constraints
+    if constraints:
+        constraint_text = []
+        if constraints.get('length'):
+            constraint_text.append(f"Length: {constraints['length']}")
+        if constraints.get('word_count'):
+            constraint_text.append(f"Target word count: {constraints['word_count']}")
+        if constraints.get('complexity'):
+            constraint_text.append(f"Complexity level: {constraints['complexity']}")
+
+        if constraint_text:
+            w("Constraints:\n")
+            w(", ".join(constraint_text))
+            w("\n\n")
+
+    # Add format instructions
+    w(suffix)
+
+    return buf.getvalue()
 
 
 class GenerationAgent(BaseAgent):
+    # Content type templates and configurations
+    CONTENT_TEMPLATES = MappingProxyType({
+        "youtube": {
+            "system_instruction": SYSTEM_INSTRUCTIONS["youtube"],
+            "format_instructions": "Include timing markers like [00:00], [01:30]. Add visual cues like 'Show on screen:', 'Cut to:', etc.",
+            "max_length": 3000
+        },
+        "tutorial": {
+            "system_instruction": SYSTEM_INSTRUCTIONS["tutorial"],
+            "format_instructions": "Use numbered steps, code blocks, and clear section headers. Include prerequisites and troubleshooting.",
+            "max_length": 5000
+        },
+        "book": {
+            "system_instruction": SYSTEM_INSTRUCTIONS["book"],
+            "format_instructions": "Include chapter introduction, main sections with subheadings, examples, and chapter summary.",
+            "max_length": 8000
+        },
+        "interactive": {
+            "system_instruction": SYSTEM_INSTRUCTIONS["interactive"],
+            "format_instructions": "Include learning objectives, interactive elements, quizzes, and hands-on exercises.",
+            "max_length": 4000
+        }
+    })
+
+    # Closing format section of the prompt for each content type, built once
+    PROMPT_SUFFIXES = MappingProxyType({
+        content_type: "\n".join([
+            "Format Requirements:",
+            template["format_instructions"],
+            "",
+            "Generate comprehensive, accurate, and engaging content that follows the structure and meets all requirements."
+        ])
+        for content_type, template in CONTENT_TEMPLATES.items()
+    })
+
+    # Prompt builders specialized per content type
+    PROMPT_BUILDERS = MappingProxyType({
+        content_type: partial(_build_prompt, f"Create {content_type} content about: ", suffix)
+        for content_type, suffix in PROMPT_SUFFIXES.items()
+    })
+
+    # Request configs per content type, reused across calls
+    STREAM_CONFIGS = MappingProxyType({
+        content_type: types.GenerateContentConfig(
+            system_instruction=template["system_instruction"],
+            temperature=0.7,
+            max_output_tokens=template["max_length"],
+            top_p=0.9,
+            top_k=40
+        )
+        for content_type, template in CONTENT_TEMPLATES.items()
+    })
+    FALLBACK_CONFIGS = MappingProxyType({
+        content_type: types.GenerateContentConfig(
+            system_instruction=template["system_instruction"],
+            temperature=0.7
+        )
+        for content_type, template in CONTENT_TEMPLATES.items()
+    })
+
+    # Gemini chunks coalesced into each piece yielded by stream()
+    STREAM_BATCH_CHUNKS = 4
+
+    # Upper bound on candidates requested in one call
+    MAX_CANDIDATES = 8
+
     def __init__(self, config: Config, memory: AgentMemory):
         super().__init__("GenerationAgent", config, memory)
-        self.gemini_client = genai.Client(api_key=config.gemini_api_key)
-
-        # Content type templates and configurations
-        self.content_templates = {
-            "youtube": {
-                "system_instruction": "You are a YouTube content creator who makes engaging, educational videos. Use timing markers, visual cues, and conversational tone.",
-                "format_instructions": "Include timing markers like [00:00], [01:30]. Add visual cues like 'Show on screen:', 'Cut to:', etc.",
-                "max_length": 3000
-            },
-            "tutorial": {
-                "system_instruction": "You are a technical writer creating step-by-step tutorials. Be clear, precise, and include practical examples.",
-                "format_instructions": "Use numbered steps, code blocks, and clear section headers. Include prerequisites and troubleshooting.",
-                "max_length": 5000
-            },
-            "book": {
-                "system_instruction": "You are an educational author writing comprehensive book chapters. Maintain academic rigor while being accessible.",
-                "format_instructions": "Include chapter introduction, main sections with subheadings, examples, and chapter summary.",
-                "max_length": 8000
-            },
-            "interactive": {
-                "system_instruction": "You are an instructional designer creating interactive learning content with quizzes and exercises.",
-                "format_instructions": "Include learning objectives, interactive elements, quizzes, and hands-on exercises.",
-                "max_length": 4000
-            }
+        self.gemini_client = get_gemini_client(config.gemini_api_key)
+
+        # Responses for near-identical topics with the same generation settings, one cache per content type
+        self.response_caches = {
+            content_type: SemanticCache(
+                memory.embed_query,
+                threshold=config.semantic_cache_threshold,
+                ttl_seconds=config.semantic_cache_ttl_seconds
+            )
+            for content_type in self.CONTENT_TEMPLATES
         }
 
+        # Extra candidates from batched calls, served to later regenerate requests for the same prompt
+        self.regeneration_candidates = TTLCache(maxsize=256, ttl=config.semantic_cache_ttl_seconds)
+
     async def process(self, task: Dict[str, Any]) -> Any:
         """Generate content using advanced prompting and context optimization"""
         self.update_status("processing")
         logger.info(f"🎯 GenerationAgent starting content generation")
 
-        content_type = task.get("content_type")
-        topic = task.get("topic")
-        plan = task.get("plan", {})
-        sources = task.get("sources", [])
-        recommendations = task.get("recommendations", [])
-        audience_level = task.get("audience_level", "intermediate")
-        tone = task.get("tone", "conversational")
-        constraints = task.get("constraints", {})
-
-        if not topic or not content_type:
+        error = self._validate_task(task)
+        if error:
             self.update_status("error")
-            return {"status": "error", "message": "Topic and content_type are required"}
+            return {"status": "error", "message": error}
 
-        if content_type not in self.content_templates:
-            self.update_status("error")
-            return {"status": "error", "message": f"Unsupported content type: {content_type}"}
+        topic = task.get("topic")
+        content_type = task.get("content_type")
 
         try:
-            # Get relevant context from memory
-            relevant_chunks = self.memory.search_relevant_content(topic, n_results=8)
-            context = self._optimize_context(relevant_chunks, self.config.max_context_tokens)
-
-            # Build comprehensive prompt
-            prompt = self._build_generation_prompt(
-                content_type, topic, plan, context, recommendations,
-                audience_level, tone, constraints
-            )
-
-            # Generate content with streaming
-            content_text = await self._generate_with_streaming(prompt, content_type)
-
-            # Post-process content
-            processed_content = self._post_process_content(content_text, content_type, constraints)
-
-            # Create content object
-            content_obj = GeneratedContent(
-                title=self._generate_title(topic, content_type),
-                content_type=content_type,
-                content=processed_content,
-                source_documents=[s.get("document_id") for s in sources if s.get("document_id")],
-                metadata={
-                    "topic": topic,
-                    "audience_level": audience_level,
-                    "tone": tone,
-                    "constraints": constraints,
-                    "recommendations_applied": recommendations,
-                    "context_chunks_used": len(relevant_chunks),
-                    "generation_timestamp": str(datetime.now()),
-                    "content_length": len(processed_content),
-                    "word_count": len(processed_content.split())
-                },
-            )
+            prompt, relevant_chunks = self._prepare_prompt(task)
+
+            # Regeneration passes (with recommendations or on request) always want a fresh response
+            regenerate = task.get("regenerate")
+            cache = None if task.get("recommendations") or regenerate else self.response_caches[content_type]
+            cache_topic, cache_scope_key = self._response_cache_key(task)
+            content_text = cache.get(cache_topic, cache_scope_key) if cache else None
+            cache_hit = content_text is not None
+
+            if not cache_hit:
+                content_text = self._pop_candidate(prompt) if regenerate else None
+
+            if content_text is None:
+                n_candidates = min(int(task.get("n_candidates", 1)), self.MAX_CANDIDATES)
+                if n_candidates > 1:
+                    content_text = await self._generate_candidates(prompt, content_type, n_candidates)
+                else:
+                    # Generate content with streaming
+                    content_text = await self._generate_with_streaming(prompt, content_type)
+                if cache:
+                    cache.set(cache_topic, content_text, cache_scope_key)
 
+            content_obj = self._build_content(task, content_text, len(relevant_chunks), cache_hit)
             content_obj.save()
             self.update_status("completed")
-            logger.info(f"✅ Generated {content_type} content: {content_obj.title} ({len(processed_content)} chars)")
+            logger.info(f"✅ Generated {content_type} content: {content_obj.title} ({len(content_obj.content)} chars)")
 
             return content_obj
 
@@ -112,27 +260,161 @@ class GenerationAgent(BaseAgent):
             fallback_content.save()
             return fallback_content
 
-    def _optimize_context(self, relevant_chunks: list, max_tokens: int) -> str:
-        """Optimize context selection to fit within token limits"""
-        if not relevant_chunks:
-            return ""
+    async def stream(self, task: Dict[str, Any]) -> AsyncIterator[str]:
+        """Yield generated text as it arrives, saving the final content once the stream completes"""
+        self.update_status("processing")
+        logger.info(f"🎯 GenerationAgent starting streamed content generation")
+
+        error = self._validate_task(task)
+        if error:
+            self.update_status("error")
+            raise ValueError(error)
+
+        topic = task.get("topic")
+        content_type = task.get("content_type")
+        buffer = io.StringIO()
+        sent = False
+
+        try:
+            prompt, relevant_chunks = self._prepare_prompt(task)
+
+            regenerate = task.get("regenerate")
+            cache = None if task.get("recommendations") or regenerate else self.response_caches[content_type]
+            cache_topic, cache_scope_key = self._response_cache_key(task)
+            cached_text = cache.get(cache_topic, cache_scope_key) if cache else None
+            ready_text = cached_text if cached_text is not None or not regenerate else self._pop_candidate(prompt)
+
+            if ready_text is not None:
+                buffer.write(ready_text)
+                yield ready_text
+                sent = True
+            else:
+                batch = []
+                async for text in self._stream_generation(prompt, content_type):
+                    buffer.write(text)
+                    batch.append(text)
+                    if len(batch) >= self.STREAM_BATCH_CHUNKS:
+                        yield "".join(batch)
+                        sent = True
+                        batch.clear()
+                if batch:
+                    yield "".join(batch)
+                    sent = True
+                if cache:
+                    cache.set(cache_topic, buffer.getvalue(), cache_scope_key)
+
+        except Exception as e:
+            self.update_status("error")
+            logger.error(f"❌ Streamed content generation failed: {e}")
+
+            fallback_content = self._create_fallback_content(topic, content_type, str(e))
+            fallback_content.save()
+            if sent:
+                # Partial text already reached the client, so end with the error instead of appending the fallback
+                raise
+            yield fallback_content.content
+            return
+
+        content_obj = self._build_content(task, buffer.getvalue(), len(relevant_chunks), cached_text is not None)
+        content_obj.save()
+        self.update_status("completed")
+        logger.info(f"✅ Streamed {content_type} content: {content_obj.title} ({len(content_obj.content)} chars)")
+
+    def _validate_task(self, task: Dict[str, Any]) -> Optional[str]:
+        """Return an error message if the task cannot be generated"""
+        content_type = task.get("content_type")
+
+        if not task.get("topic") or not content_type:
+            return "Topic and content_type are required"
+
+        if content_type not in self.CONTENT_TEMPLATES:
+            return f"Unsupported content type: {content_type}"
+
+        return None
 
-        # Sort by relevance score
-        sorted_chunks = sorted(relevant_chunks, key=lambda x: x.get('score', 0), reverse=True)
+    def _prepare_prompt(self, task: Dict[str, Any]) -> Tuple[str, list]:
+        """Retrieve relevant context from memory and build the generation prompt"""
+        topic = task.get("topic")
+
+        # Get relevant context from memory
+        relevant_chunks = self.memory.search_relevant_content(topic, n_results=8)
+        context = self._optimize_context(relevant_chunks, self.config.max_context_tokens)
+
+        # Build comprehensive prompt
+        prompt = self._build_generation_prompt(
+            task.get("content_type"), topic, task.get("plan", {}), context,
+            task.get("recommendations", []), task.get("audience_level", "intermediate"),
+            task.get("tone", "conversational"), task.get("constraints", {})
+        )
+        return prompt, relevant_chunks
+
+    @staticmethod
+    def _response_cache_key(task: Dict[str, Any]) -> Tuple[str, str]:
+        """Response cache text and scope: only the topic is embedded, every other setting must match exactly"""
+        plan = task.get("plan") or {}
+        return task.get("topic"), cache_scope(
+            task.get("content_type"), task.get("audience_level", "intermediate"),
+            task.get("tone", "conversational"), task.get("constraints", {}),
+            {field: plan.get(field) for field in _PLAN_CACHE_FIELDS}
+        )
+
+    def _build_content(self, task: Dict[str, Any], content_text: str, context_chunks_used: int,
+                       cache_hit: bool = False) -> GeneratedContent:
+        """Post-process generated text and wrap it in a content object"""
+        topic = task.get("topic")
+        content_type = task.get("content_type")
+        constraints = task.get("constraints", {})
 
-        context_parts = []
-        estimated_tokens = 0
+        # Post-process content
+        processed_content = self._post_process_content(content_text, content_type, constraints)
 
-        for chunk in sorted_chunks:
-            content = chunk['content']
-            # Rough token estimation (1 token ≈ 4 characters)
-            chunk_tokens = len(content) // 4
+        return GeneratedContent(
+            title=self._generate_title(topic, content_type),
+            content_type=content_type,
+            content=processed_content,
+            content_digest=self._content_digest(processed_content),
+            source_documents=[s.get("document_id") for s in task.get("sources", []) if s.get("document_id")],
+            metadata={
+                "topic": topic,
+                "audience_level": task.get("audience_level", "intermediate"),
+                "tone": task.get("tone", "conversational"),
+                "constraints": constraints,
+                "recommendations_applied": task.get("recommendations", []),
+                "context_chunks_used": context_chunks_used,
+                "cache_hit": cache_hit,
+                "generation_timestamp": datetime.now(timezone.utc).isoformat(),
+                "content_length": len(processed_content),
+                "word_count": len(processed_content.split())
+            },
+        )
 
-            if estimated_tokens + chunk_tokens > max_tokens:
-                break
+    def _optimize_context(self, relevant_chunks: list, max_tokens: int) -> str:
+        """Optimize context selection to fit within token limits"""
+        if not relevant_chunks:
+            return ""
 
-            context_parts.append(f"Source: {chunk['metadata'].get('document_title', 'Unknown')}\n{content}")
-            estimated_tokens += chunk_tokens
+        # Count tokens with a BPE tokenizer, batch-encoding chunks not counted yet
+        uncounted = [chunk for chunk in relevant_chunks if '_tok' not in chunk]
+        if uncounted:
+            encoded = _get_token_encoding().encode_batch(
+                [chunk['content'] for chunk in uncounted], disallowed_special=()
+            )
+            for chunk, tokens in zip(uncounted, encoded):
+                chunk['_tok'] = len(tokens)
+
+        # Take chunks by descending relevance while the running token total fits the budget
+        count = len(relevant_chunks)
+        scores = np.fromiter((chunk.get('score', 0) for chunk in relevant_chunks), dtype=np.float64, count=count)
+        tokens = np.fromiter((chunk['_tok'] for chunk in relevant_chunks), dtype=np.int64, count=count)
+        order = np.argsort(-scores, kind="stable")
+        running_tokens = np.cumsum(tokens[order])
+        selected = int(np.searchsorted(running_tokens, max_tokens, side="right"))
+        estimated_tokens = int(running_tokens[selected - 1]) if selected else 0
+
+        context_parts = [
+            f"Source: {chunk['metadata'].get('document_title', 'Unknown')}\n{chunk['content']}"
+            for chunk in (relevant_chunks[i] for i in order[:selected])
+        ]
 
         logger.info(f"Selected {len(context_parts)} context chunks (~{estimated_tokens} tokens)")
         return "\n\n---\n\n".join(context_parts)
@@ -141,118 +423,89 @@ class GenerationAgent(BaseAgent):
                                  context: str, recommendations: list, audience_level: str,
                                  tone: str, constraints: dict) -> str:
         """Build comprehensive generation prompt"""
+        return self.PROMPT_BUILDERS[content_type](
+            topic, plan, context, recommendations, audience_level, tone, constraints
+        )
 
-        template = self.content_templates[content_type]
-
-        prompt_parts = [
-            f"Create {content_type} content about: {topic}",
-            f"Target audience: {audience_level}",
-            f"Tone and style: {tone}",
-            ""
-        ]
-
-        # Add outline if available
-        if plan.get('outline'):
-            prompt_parts.extend([
-                "Content Structure:",
-                "\n".join(f"- {item}" for item in plan['outline']),
-                ""
-            ])
-
-        # Add learning objectives
-        if plan.get('objectives'):
-            prompt_parts.extend([
-                "Learning Objectives:",
-                "\n".join(f"- {obj}" for obj in plan['objectives']),
-                ""
-            ])
-
-        # Add context from sources
-        if context:
-            prompt_parts.extend([
-                "Reference Material:",
-                context[:4000],  # Limit context length
-                ""
-            ])
-
-        # Add improvement recommendations
-        if recommendations:
-            prompt_parts.extend([
-                "Improvement Guidelines:",
-                "\n".join(f"- {rec}" for rec in recommendations),
-                ""
-            ])
-
-        # Add constraints
-        if constraints:
-            constraint_text = []
-            if constraints.get('length'):
-                constraint_text.append(f"Length: {constraints['length']}")
-            if constraints.get('word_count'):
-                constraint_text.append(f"Target word count: {constraints['word_count']}")
-            if constraints.get('complexity'):
-                constraint_text.append(f"Complexity level: {constraints['complexity']}")
-
-            if constraint_text:
-                prompt_parts.extend([
-                    "Constraints:",
-                    ", ".join(constraint_text),
-                    ""
-                ])
-
-        # Add format instructions
-        prompt_parts.extend([
-            "Format Requirements:",
-            template["format_instructions"],
-            "",
-            "Generate comprehensive, accurate, and engaging content that follows the structure and meets all requirements."
-        ])
+    async def _stream_generation(self, prompt: str, content_type: str) -> AsyncIterator[str]:
+        """Yield text chunks from the Gemini streaming API, each one bounded by the generation timeout"""
+        stream = self._stream_with_timeout(
+            lambda: self.gemini_client.aio.models.generate_content_stream(
+                model="gemini-1.5-flash",
+                contents=prompt,
+                config=self.STREAM_CONFIGS[content_type],
+            ),
+            self.config.gemini_generation_timeout_s
+        )
 
-        return "\n".join(prompt_parts)
+        async for chunk in stream:
+            if chunk.text:
+                yield chunk.text
 
     async def _generate_with_streaming(self, prompt: str, content_type: str) -> str:
         """Generate content with streaming for better performance"""
-        template = self.content_templates[content_type]
-
+        timeout = self.config.gemini_generation_timeout_s
         try:
-            response = self.gemini_client.models.generate_content_stream(
-                model="gemini-1.5-flash",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    system_instruction=template["system_instruction"],
-                    temperature=0.7,
-                    max_output_tokens=template["max_length"],
-                    top_p=0.9,
-                    top_k=40
-                ),
-            )
-
-            content_parts = []
-            async for chunk in response:
-                if chunk.text:
-                    content_parts.append(chunk.text)
-
-            return "".join(content_parts)
+            # The stream takes its own call slot and timeouts, so it is not wrapped in _call_with_timeout
+            return await self._collect_stream(prompt, content_type)
 
         except Exception as e:
             logger.error(f"❌ Streaming generation failed: {e}")
             # Fallback to non-streaming
-            response = self.gemini_client.models.generate_content(
-                model="gemini-1.5-flash",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    system_instruction=template["system_instruction"],
-                    temperature=0.7
+            response = await self._call_with_timeout(
+                lambda: self.gemini_client.aio.models.generate_content(
+                    model="gemini-1.5-flash",
+                    contents=prompt,
+                    config=self.FALLBACK_CONFIGS[content_type],
                 ),
+                timeout
             )
             return response.candidates[0].content.parts[0].text
 
+    async def _generate_candidates(self, prompt: str, content_type: str, n_candidates: int) -> str:
+        """Generate several candidates in one call, returning the first and keeping the rest for regeneration"""
+        config = self.STREAM_CONFIGS[content_type].model_copy(update={"candidate_count": n_candidates})
+        response = await self._call_with_timeout(
+            lambda: self.gemini_client.aio.models.generate_content(
+                model="gemini-1.5-flash",
+                contents=prompt,
+                config=config,
+            ),
+            self.config.gemini_generation_timeout_s
+        )
+
+        texts = [candidate.content.parts[0].text for candidate in response.candidates
+                 if candidate.content and candidate.content.parts]
+        if not texts:
+            raise ValueError("Gemini returned no candidates")
+
+        self.regeneration_candidates[self._prompt_key(prompt)] = texts[1:]
+        logger.info(f"🗂️ Kept {len(texts) - 1} extra candidates for regeneration")
+        return texts[0]
+
+    def _pop_candidate(self, prompt: str) -> Optional[str]:
+        """Take a stored candidate for this prompt, if any remain"""
+        candidates = self.regeneration_candidates.get(self._prompt_key(prompt))
+        return candidates.pop(0) if candidates else None
+
+    @staticmethod
+    def _prompt_key(prompt: str) -> str:
+        return hashlib.md5(prompt.encode("utf-8", "ignore"), usedforsecurity=False).hexdigest()
+
+    async def _collect_stream(self, prompt: str, content_type: str) -> str:
+        """Consume the Gemini stream into a single string"""
+        buffer = io.StringIO()
+        async for text in self._stream_generation(prompt, content_type):
+            buffer.write(text)
+
+        return buffer.getvalue()
+
     def _post_process_content(self, content: str, content_type: str, constraints: dict) -> str:
         """Post-process generated content for quality and formatting"""
 
         # Remove excessive whitespace
-        content = "\n".join(line.strip() for line in content.split("\n"))
-        content = content.replace("\n\n\n", "\n\n")
+        content = _WS_LINE_RE.sub("", content)
+        content = _MULTI_NL_RE.sub("\n\n", content)
 
         # Apply word count constraints if specified
         if constraints.get('word_count'):
@@ -260,9 +513,9 @@ class GenerationAgent(BaseAgent):
             current_words = len(content.split())
 
             if current_words > target_words * 1.2:  # 20% over target
-                # Truncate content intelligently
-                words = content.split()
-                content = " ".join(words[:target_words])
+                # Cut the original text right after the target word so its formatting survives
+                last_word = next(islice(_WORD_RE.finditer(content), target_words - 1, None))
+                content = content[:last_word.end()]
                 content += "\n\n[Content truncated to meet word count requirements]"
 
         # Content type specific post-processing
@@ -332,16 +585,14 @@ class GenerationAgent(BaseAgent):
 
     def _generate_title(self, topic: str, content_type: str) -> str:
         """Generate appropriate title based on content type"""
-        type_prefixes = {
-            "youtube": "Video:",
-            "tutorial": "Tutorial:",
-            "book": "Chapter:",
-            "interactive": "Interactive Guide:"
-        }
-
-        prefix = type_prefixes.get(content_type, "Content:")
+        prefix = _TYPE_PREFIXES.get(content_type, "Content:")
         return f"{prefix} {topic}"
 
+    @staticmethod
+    def _content_digest(content: str) -> str:
+        """Short BLAKE2b digest of the content, for finding repeated output without touching the document ID"""
+        return hashlib.blake2b(content.encode("utf-8", "ignore"), digest_size=8, usedforsecurity=False).hexdigest()
+
     def _create_fallback_content(self, topic: str, content_type: str, error: str) -> GeneratedContent:
         """Create fallback content when generation fails"""
         fallback_templates = {
@@ -359,58 +610,6 @@ class GenerationAgent(BaseAgent):
             metadata={
                 "error": error,
                 "fallback": True,
-                "generation_timestamp": str(datetime.now())
+                "generation_timestamp": datetime.now(timezone.utc).isoformat()
             }
         )
-
-        prompt_base = f"""Generate {content_type} content for {topic}.
-Outline: {chr(10).join(f'- {item}' for item in plan.get('outline', []))}
-Objectives: {chr(10).join(f'- {item}' for item in plan.get('objectives', []))}
-Context from sources: {context[:4000]}
-Improve based on recommendations: {', '.join(recommendations)}
-"""
-
-        if content_type == "youtube":
-            prompt = prompt_base + "Format as a script with timing markers (e.g., [00:00] Intro)."
-        elif content_type == "book":
-            prompt = prompt_base + "Format as a chapter with sections and learning objectives."
-        elif content_type == "tutorial":
-            prompt = prompt_base + "Format as step-by-step guide with examples."
-        elif content_type == "interactive":
-            prompt = prompt_base + "Include quizzes and exercises."
-        else:
-            self.update_status("error")
-            return {"status": "error", "message": f"Unknown content type: {content_type}"}
-
-        try:
-            response = self.gemini_client.models.generate_content_stream(
-                model="gemini-1.5-flash",
-                contents=prompt,
-                config=types.GenerateContentConfig(system_instruction=system_instruction, temperature=0.7),
-            )
-            content_text = ""
-            async for chunk in response:
-                content_text += chunk.text
-
-            content_obj = GeneratedContent(
-                id=f"{content_type}_{topic.replace(' ', '_')}_{str(hash(content_text))}",
-                title=f"{content_type.capitalize()}: {topic}",
-                content_type=content_type,
-                content=content_text,
-                source_documents=[s.get("document_id") for s in sources],
-                metadata={"recommendations_applied": recommendations},
-            )
-            content_obj.save()
-            return content_obj
-        except Exception as e:
-            logger.error(f"Generation failed: {e}")
-            content_obj = GeneratedContent(
-                id=f"{content_type}_{topic.replace(' ', '_')}",
-                title=f"{content_type.capitalize()}: {topic}",
-                content_type=content_type,
-                content=f"Placeholder {content_type} for {topic}. Error: {str(e)}",
-                source_documents=[],
-                metadata={},
-            )
-            content_obj.save()
-            return content_obj
\ No newline at end of file
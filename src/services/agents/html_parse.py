@@ -0,0 +1,51 @@
+from typing import List, Tuple
+from urllib.parse import urldefrag, urljoin
+
+from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser
+
+from configuration.configuration import logger
+
+
+# Page elements dropped before text extraction, matched in one selector pass
+_STRIPPED_SELECTOR = "script,style,nav,footer,header"
+
+
+def _parse_page(html: bytes, base_url: str) -> Tuple[str, List[str]]:
+    """Extract visible text and absolute http(s) links from a page"""
+    try:
+        return _parse_page_lexbor(html, base_url)
+    except Exception as e:
+        logger.warning(f"⚠️ lexbor failed to parse {base_url}, falling back to BeautifulSoup: {e}")
+        return _parse_page_soup(html, base_url)
+
+
+def _parse_page_lexbor(html: bytes, base_url: str) -> Tuple[str, List[str]]:
+    tree = LexborHTMLParser(html)
+    links = _absolute_links((node.attributes.get("href") for node in tree.css("a[href]")), base_url)
+
+    # Remove script and style elements
+    for node in tree.css(_STRIPPED_SELECTOR):
+        node.decompose()
+    root = tree.body or tree.root
+    text = root.text(separator=" ", strip=True) if root else ""
+    return text, links
+
+
+def _parse_page_soup(html: bytes, base_url: str) -> Tuple[str, List[str]]:
+    soup = BeautifulSoup(html, "html.parser")
+    links = _absolute_links((node.get("href") for node in soup.find_all("a", href=True)), base_url)
+
+    # Remove script and style elements
+    for node in soup.select(_STRIPPED_SELECTOR):
+        node.decompose()
+    return soup.get_text(separator=" ", strip=True), links
+
+
+def _absolute_links(hrefs, base_url: str) -> List[str]:
+    links = []
+    for href in hrefs:
+        link = urldefrag(urljoin(base_url, href or ""))[0]
+        if link.startswith(("http://", "https://")):
+            links.append(link)
+    return links
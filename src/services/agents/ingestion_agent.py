@@ -1,27 +1,129 @@
 import aiohttp
-import docker
-import os
+import asyncio
+import multiprocessing
+import orjson
 import re
-import hashlib
-from typing import Any, Dict, List
-from bs4 import BeautifulSoup
-from tempfile import mkdtemp
-from shutil import rmtree
-from google import genai
-from urllib.parse import urljoin, urlparse
+import xxhash
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from cachetools import LRUCache
+from datasketch import MinHash, MinHashLSH
+from google.genai import types
+from urllib.parse import urlparse
 
 from services.base_agent import BaseAgent
+from services.agents.html_parse import _parse_page
 from services.memory import AgentMemory
+from services.gemini_client import get_gemini_client
 from models.models import SourceDocument
 from configuration.configuration import Configuration as Config, logger
 
 
+# Keyword classification in one case-insensitive pass; groups are listed in category priority order
+_CATEGORY_PRIORITY = ["tutorial", "example", "reference"]
+_KEYWORD_RE = re.compile(
+    r"(?P<tutorial>tutorial|step by step)|(?P<example>example|code sample)|(?P<reference>api|reference|documentation)",
+    re.IGNORECASE
+)
+
+# Text cleanup patterns
+_WS_RE = re.compile(r'\s+')
+_ARTIFACTS_RE = re.compile(r'(Cookie|Privacy Policy|Terms of Service|Subscribe|Newsletter)', re.IGNORECASE)
+_URL_RE = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+_HEADER_RE = re.compile(r'#{1,6}\s*')
+_EMPHASIS_RE = re.compile(r'\*{1,2}([^*]+)\*{1,2}')
+_INLINE_CODE_RE = re.compile(r'`([^`]+)`')
+
+# Structured output for the combined classification / concept / relationship call
+_DOC_TYPES = ["tutorial", "reference", "example", "overview"]
+_RELATION_TYPES = ["related_to", "part_of", "enables", "requires", "implements"]
+_ANALYSIS_CONFIG = types.GenerateContentConfig(
+    response_mime_type="application/json",
+    response_schema={
+        "type": "OBJECT",
+        "properties": {
+            "doc_type": {"type": "STRING", "enum": _DOC_TYPES},
+            "concepts": {"type": "ARRAY", "items": {"type": "STRING"}},
+            "relationships": {
+                "type": "ARRAY",
+                "items": {
+                    "type": "OBJECT",
+                    "properties": {
+                        "source": {"type": "STRING"},
+                        "target": {"type": "STRING"},
+                        "type": {"type": "STRING", "enum": _RELATION_TYPES},
+                    },
+                    "required": ["source", "target", "type"],
+                },
+            },
+        },
+        "required": ["doc_type", "concepts", "relationships"],
+    },
+)
+
+# GitHub documentation file patterns, in order of importance. Fused into one regex whose
+# alternatives are tried in this order, so the matching group's index is the file's priority.
+_GITHUB_PRIORITY_PATTERNS = [
+    r'readme\.md$',
+    r'readme\.rst$',
+    r'readme\.txt$',
+    r'docs?/.*\.md$',
+    r'documentation/.*\.md$',
+    r'guide.*\.md$',
+    r'tutorial.*\.md$',
+    r'getting.?started.*\.md$',
+    r'api.*\.md$',
+    r'reference.*\.md$'
+]
+_GITHUB_PRIORITY_RE = re.compile(
+    "|".join(f"(?P<p{i}>.*?{pattern})" for i, pattern in enumerate(_GITHUB_PRIORITY_PATTERNS)),
+    re.IGNORECASE
+)
+
+
+@lru_cache(maxsize=1)
+def _get_parse_executor(max_workers: int) -> ProcessPoolExecutor:
+    """
+    Share one small process pool for CPU-bound HTML parsing; spawned, since the parent runs threads.
+    Each gunicorn worker creates its own pool, so the total is workers x max_workers processes.
+    """
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
 class IngestionAgent(BaseAgent):
     def __init__(self, config: Config, memory: AgentMemory):
         super().__init__("IngestionAgent", config, memory)
-        self.gemini_client = genai.Client(api_key=config.gemini_api_key)
+        self.gemini_client = get_gemini_client(config.gemini_api_key)
         self.processed_sources = set()
 
+        # One HTTP session for the agent's lifetime, created on first use inside the event loop
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._github_headers = {"Accept": "application/vnd.github+json"}
+        if config.github_token:
+            self._github_headers["Authorization"] = f"Bearer {config.github_token}"
+
+        # MinHash LSH index of stored documents, to skip near-duplicates before any Gemini calls
+        self.lsh = MinHashLSH(threshold=0.85, num_perm=128)
+        # Hashes of stored cleaned content, so exact repeats from different sources skip even the MinHash
+        self.content_hashes = set()
+
+        # Gemini analyses keyed by a hash of the analyzed preview, so re-ingesting known content skips the call
+        self.analysis_cache = LRUCache(maxsize=1024)
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30))
+        return self._session
+
+    async def close(self):
+        """Close the shared HTTP session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
     async def process(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """Main processing entry point for different source types"""
         self.update_status("processing")
@@ -50,6 +152,12 @@ class IngestionAgent(BaseAgent):
             self.update_status("error")
             logger.error(f"❌ IngestionAgent error: {e}")
             return {"status": "error", "message": str(e)}
+        finally:
+            # Persist the concepts and relationships queued for this source before reporting back
+            try:
+                self.memory.flush()
+            except Exception as e:
+                logger.error(f"❌ Failed to store queued concepts for {source[:100]}: {e}")
 
     async def _process_text_content(self, content: str, metadata: Dict) -> Dict[str, Any]:
         """Process raw text content"""
@@ -59,10 +167,18 @@ class IngestionAgent(BaseAgent):
 
         # Clean and preprocess text
         cleaned_content = self._clean_text(content)
-        doc_type = await self._classify_content_advanced(cleaned_content)
+        content_hash = xxhash.xxh3_128_hexdigest(cleaned_content.encode())
+        if content_hash in self.content_hashes:
+            return {"status": "skipped", "message": "Duplicate content detected"}
+
+        minhash = self._minhash(cleaned_content)
+        if self.lsh.query(minhash):
+            return {"status": "skipped", "message": "Near-duplicate content detected"}
+
+        analysis = await self._analyze_content(cleaned_content)
+        doc_type = analysis["doc_type"]
 
         # Generate unique ID
-        content_hash = hashlib.md5(cleaned_content.encode()).hexdigest()
         doc_id = f"text_{content_hash}"
 
         doc = SourceDocument(
@@ -76,13 +192,15 @@ class IngestionAgent(BaseAgent):
                 **metadata,
                 "content_length": len(cleaned_content),
                 "word_count": len(cleaned_content.split()),
-                "processing_timestamp": str(datetime.now())
+                "processing_timestamp": datetime.now(timezone.utc).isoformat()
             },
         )
 
         if not self.memory.check_duplicate(doc):
             self.memory.store_document(doc)
-            await self._extract_concepts_and_relationships(doc)
+            self._index_minhash(doc.id, minhash)
+            self.content_hashes.add(content_hash)
+            self._store_concepts_and_relationships(doc, analysis)
             self.update_status("completed")
             return {
                 "status": "success",
@@ -105,56 +223,8 @@ class IngestionAgent(BaseAgent):
 
         try:
             logger.info(f"🌐 Scraping website: {url} (depth: {depth})")
-            temp_dir = mkdtemp()
-            docker_client = docker.from_env()
-
-            # Enhanced httrack command with better filtering
-            container = docker_client.containers.run(
-                self.config.httrack_docker_image,
-                command=[
-                    url,
-                    f"--depth={depth}",
-                    "--mirror",
-                    "--path", "/output",
-                    "--ext-depth=1",  # Limit external links
-                    "--robots=0",  # Ignore robots.txt
-                    "--timeout=30",  # Connection timeout
-                    "--retries=2"  # Retry attempts
-                ],
-                volumes={temp_dir: {'bind': '/output', 'mode': 'rw'}},
-                detach=True,
-                remove=True,
-                mem_limit="512m"  # Memory limit for safety
-            )
-
-            # Wait with timeout
-            result = container.wait(timeout=300)  # 5 minute timeout
-            if result['StatusCode'] != 0:
-                logger.warning(f"⚠️ httrack exited with code {result['StatusCode']}")
-
-            # Process scraped content
-            content_parts = []
-            processed_files = 0
-
-            for root, _, files in os.walk(temp_dir):
-                for file in files:
-                    if file.endswith(('.html', '.htm')):
-                        try:
-                            file_path = os.path.join(root, file)
-                            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                                soup = BeautifulSoup(f.read(), "html.parser")
-
-                                # Remove script and style elements
-                                for script in soup(["script", "style", "nav", "footer", "header"]):
-                                    script.decompose()
-
-                                # Extract meaningful text
-                                text = soup.get_text(separator=" ", strip=True)
-                                if len(text) > 200:  # Only include substantial content
-                                    content_parts.append(text)
-                                    processed_files += 1
-                        except Exception as e:
-                            logger.warning(f"⚠️ Error processing file {file}: {e}")
+            content_parts = await self._crawl(url, depth)
+            processed_files = len(content_parts)
 
             # Combine and clean content
             raw_content = "\n\n".join(content_parts)
@@ -163,8 +233,17 @@ class IngestionAgent(BaseAgent):
             if len(text_content) < self.config.min_content_length:
                 return {"status": "error", "message": f"Scraped content too short ({len(text_content)} chars)"}
 
+            content_hash = xxhash.xxh3_128_hexdigest(text_content.encode())
+            if content_hash in self.content_hashes:
+                return {"status": "skipped", "message": "Duplicate content detected", "url": url}
+
+            minhash = self._minhash(text_content)
+            if self.lsh.query(minhash):
+                return {"status": "skipped", "message": "Near-duplicate content detected", "url": url}
+
             # Advanced content classification
-            doc_type = await self._classify_content_advanced(text_content)
+            analysis = await self._analyze_content(text_content)
+            doc_type = analysis["doc_type"]
 
             # Extract title from URL or content
             title = self._extract_title_from_content(text_content) or urlparse(url).netloc
@@ -180,17 +259,18 @@ class IngestionAgent(BaseAgent):
                     "depth": depth,
                     "files_processed": processed_files,
                     "content_length": len(text_content),
-                    "scraping_timestamp": str(datetime.now()),
+                    "scraping_timestamp": datetime.now(timezone.utc).isoformat(),
                     "domain": urlparse(url).netloc
                 },
             )
 
             if not self.memory.check_duplicate(document):
                 self.memory.store_document(document)
-                await self._extract_concepts_and_relationships(document)
+                self._index_minhash(document.id, minhash)
+                self.content_hashes.add(content_hash)
+                self._store_concepts_and_relationships(document, analysis)
                 self.processed_sources.add(url)
 
-            rmtree(temp_dir)
             self.update_status("completed")
 
             return {
@@ -211,6 +291,69 @@ class IngestionAgent(BaseAgent):
             logger.error(f"❌ Website scraping failed for {url}: {e}")
             return {"status": "error", "message": f"Website scraping failed: {str(e)}"}
 
+    async def _crawl(self, url: str, depth: int) -> List[str]:
+        """Breadth-first crawl of same-site pages, returning the text of substantial ones"""
+        domain = urlparse(url).netloc
+        seen = {url}
+        content_parts = []
+        queue: asyncio.Queue = asyncio.Queue()
+        queue.put_nowait((url, 1))
+        loop = asyncio.get_running_loop()
+        session = await self._get_session()
+
+        async def worker():
+            while True:
+                page_url, level = await queue.get()
+                try:
+                    html = await self._fetch_html(session, page_url)
+                    if html is None:
+                        continue
+
+                    # Parse in the process pool so other pages keep downloading
+                    text, links = await loop.run_in_executor(
+                        _get_parse_executor(self.config.crawl_parse_workers), _parse_page, html, page_url
+                    )
+                    if len(text) > 200:  # Only include substantial content
+                        content_parts.append(text)
+
+                    if level < depth:
+                        for link in links:
+                            if len(seen) >= self.config.crawl_max_pages:
+                                break
+                            if link not in seen and urlparse(link).netloc == domain:
+                                seen.add(link)
+                                queue.put_nowait((link, level + 1))
+                except Exception as e:
+                    logger.warning(f"⚠️ Error processing page {page_url}: {e}")
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.config.crawl_concurrency)]
+        try:
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        return content_parts
+
+    async def _fetch_html(self, session: aiohttp.ClientSession, url: str) -> Optional[bytes]:
+        """Fetch a page's raw bytes if it is HTML; the parser detects the encoding"""
+        async with session.get(url) as resp:
+            if resp.status != 200 or "html" not in resp.headers.get("Content-Type", ""):
+                return None
+            if (resp.content_length or 0) > self.config.crawl_max_page_bytes:
+                logger.warning(f"⚠️ Skipping oversized page {url} ({resp.content_length} bytes)")
+                return None
+            # Cap what is buffered when the server sends no length
+            body = bytearray()
+            async for chunk in resp.content.iter_chunked(65536):
+                body += chunk
+                if len(body) >= self.config.crawl_max_page_bytes:
+                    break
+            return bytes(body[:self.config.crawl_max_page_bytes])
+
     async def _process_github_repo(self, repo_url: str) -> Dict[str, Any]:
         """Enhanced GitHub repository processing with intelligent file prioritization"""
         if repo_url in self.processed_sources:
@@ -224,54 +367,44 @@ class IngestionAgent(BaseAgent):
 
             owner, repo = parts[-2], parts[-1]
 
-            # Priority file patterns (in order of importance)
-            priority_patterns = [
-                r'readme\.md$',
-                r'readme\.rst$',
-                r'readme\.txt$',
-                r'docs?/.*\.md$',
-                r'documentation/.*\.md$',
-                r'guide.*\.md$',
-                r'tutorial.*\.md$',
-                r'getting.?started.*\.md$',
-                r'api.*\.md$',
-                r'reference.*\.md$'
-            ]
+            session = await self._get_session()
+
+            # Get repository contents
+            async with session.get(f"https://api.github.com/repos/{owner}/{repo}/contents",
+                                   headers=self._github_headers) as resp:
+                resp.raise_for_status()
+                contents = orjson.loads(await resp.read())
+
+            # Also check common documentation directories
+            doc_dirs = [item['url'] for item in contents
+                        if item['type'] == 'dir' and item['name'].lower() in ['docs', 'documentation', 'doc']]
+            for dir_contents in await asyncio.gather(*(self._fetch_github_listing(session, url) for url in doc_dirs)):
+                contents.extend(dir_contents)
 
-            async with aiohttp.ClientSession() as session:
-                # Get repository contents
-                async with session.get(f"https://api.github.com/repos/{owner}/{repo}/contents") as resp:
-                    resp.raise_for_status()
-                    contents = await resp.json()
-
-                # Collect files by priority
-                collected_files = []
-                await self._collect_github_files(session, contents, priority_patterns, collected_files)
-
-                # Also check common documentation directories
-                for item in contents:
-                    if item['type'] == 'dir' and item['name'].lower() in ['docs', 'documentation', 'doc']:
-                        async with session.get(item['url']) as resp:
-                            if resp.status == 200:
-                                dir_contents = await resp.json()
-                                await self._collect_github_files(session, dir_contents, priority_patterns,
-                                                                 collected_files)
+            # Collect files by priority
+            collected_files = await self._collect_github_files(session, contents)
 
             if not collected_files:
                 return {"status": "error", "message": "No documentation files found in repository"}
 
-            # Combine content with metadata
-            content_sections = []
-            for file_info in collected_files:
-                content_sections.append(f"## {file_info['name']}\n\n{file_info['content']}")
-
-            text_content = "\n\n".join(content_sections)
-            cleaned_content = self._clean_text(text_content)
+            # Files are cleaned as they are collected, so only the joined result is assembled here
+            cleaned_content = " ".join(
+                f"{file_info['name']} {file_info['content']}" for file_info in collected_files
+            )
 
             if len(cleaned_content) < self.config.min_content_length:
                 return {"status": "error", "message": f"Repository content too short ({len(cleaned_content)} chars)"}
 
-            doc_type = await self._classify_content_advanced(cleaned_content)
+            content_hash = xxhash.xxh3_128_hexdigest(cleaned_content.encode())
+            if content_hash in self.content_hashes:
+                return {"status": "skipped", "message": "Duplicate content detected", "url": repo_url}
+
+            minhash = self._minhash(cleaned_content)
+            if self.lsh.query(minhash):
+                return {"status": "skipped", "message": "Near-duplicate content detected", "url": repo_url}
+
+            analysis = await self._analyze_content(cleaned_content)
+            doc_type = analysis["doc_type"]
             title = f"{owner}/{repo} Documentation"
 
             document = SourceDocument(
@@ -286,13 +419,15 @@ class IngestionAgent(BaseAgent):
                     "repository": repo,
                     "files_processed": len(collected_files),
                     "content_length": len(cleaned_content),
-                    "processing_timestamp": str(datetime.now())
+                    "processing_timestamp": datetime.now(timezone.utc).isoformat()
                 },
             )
 
             if not self.memory.check_duplicate(document):
                 self.memory.store_document(document)
-                await self._extract_concepts_and_relationships(document)
+                self._index_minhash(document.id, minhash)
+                self.content_hashes.add(content_hash)
+                self._store_concepts_and_relationships(document, analysis)
                 self.processed_sources.add(repo_url)
 
             self.update_status("completed")
@@ -314,51 +449,103 @@ class IngestionAgent(BaseAgent):
             logger.error(f"❌ GitHub processing failed for {repo_url}: {e}")
             return {"status": "error", "message": f"GitHub processing failed: {str(e)}"}
 
-    async def _collect_github_files(self, session: aiohttp.ClientSession, contents: List, patterns: List[str],
-                                    collected: List):
-        """Collect GitHub files based on priority patterns"""
-        for item in contents:
-            if item['type'] == 'file':
-                file_name = item['name'].lower()
-
-                # Check against priority patterns
-                for pattern in patterns:
-                    if re.search(pattern, file_name, re.IGNORECASE):
-                        try:
-                            async with session.get(item['download_url']) as resp:
-                                if resp.status == 200:
-                                    content = await resp.text()
-                                    collected.append({
-                                        'name': item['name'],
-                                        'content': content,
-                                        'size': item['size'],
-                                        'priority': patterns.index(pattern)
-                                    })
-                                    break  # Found match, don't check other patterns
-                        except Exception as e:
-                            logger.warning(f"⚠️ Failed to download {item['name']}: {e}")
+    async def _fetch_github_listing(self, session: aiohttp.ClientSession, url: str) -> List:
+        """Fetch a GitHub directory listing, empty if unavailable"""
+        async with session.get(url, headers=self._github_headers) as resp:
+            return orjson.loads(await resp.read()) if resp.status == 200 else []
+
+    async def _collect_github_files(self, session: aiohttp.ClientSession, contents: List) -> List[Dict]:
+        """Collect GitHub files based on priority patterns, downloading them concurrently"""
+        matches = self._match_github_files(contents)
+
+        # Bound concurrent downloads per repository
+        semaphore = asyncio.Semaphore(10)
+
+        async def download(url: str) -> Optional[str]:
+            async with semaphore:
+                return await self._download_github_file(session, url)
+
+        downloads = await asyncio.gather(
+            *(download(item['download_url']) for _, item in matches),
+            return_exceptions=True
+        )
+
+        collected = []
+        for (priority, item), content in zip(matches, downloads):
+            if isinstance(content, Exception):
+                logger.warning(f"⚠️ Failed to download {item['name']}: {content}")
+            elif content is not None:
+                collected.append({
+                    'name': item['name'],
+                    'content': self._clean_text(content),
+                    'size': item['size'],
+                    'priority': priority
+                })
 
         # Sort by priority (lower index = higher priority)
         collected.sort(key=lambda x: x['priority'])
+        return collected
+
+    @staticmethod
+    def _match_github_files(contents: List) -> List[Tuple[int, Dict]]:
+        """Pair each listed file with the index of the first priority pattern it matches"""
+        matches = []
+        for item in contents:
+            if item['type'] == 'file':
+                match = _GITHUB_PRIORITY_RE.match(item['name'])
+                if match:
+                    matches.append((int(match.lastgroup[1:]), item))
+        return matches
+
+    async def _download_github_file(self, session: aiohttp.ClientSession, url: str) -> Optional[str]:
+        """Download a file, reusing the cached copy when its ETag is unchanged"""
+        cached = self.memory.http_cache.get(url)
+        headers = {"Accept": "application/vnd.github.v3.raw"}
+        if cached:
+            headers["If-None-Match"] = cached[0]
+
+        async with session.get(url, headers=headers) as resp:
+            if resp.status == 304 and cached:
+                return cached[1]
+            if resp.status != 200:
+                return None
+
+            content = (await resp.read()).decode(resp.charset or "utf-8", errors="replace")
+            etag = resp.headers.get("ETag")
+            if etag:
+                self.memory.http_cache[url] = (etag, content)
+            return content
 
     def _clean_text(self, text: str) -> str:
         """Clean and normalize text content"""
         # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
+        text = _WS_RE.sub(' ', text)
 
         # Remove common web artifacts
-        text = re.sub(r'(Cookie|Privacy Policy|Terms of Service|Subscribe|Newsletter)', '', text, flags=re.IGNORECASE)
+        text = _ARTIFACTS_RE.sub('', text)
 
         # Remove URLs (but keep the text around them)
-        text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+        text = _URL_RE.sub('', text)
 
         # Clean up markdown artifacts
-        text = re.sub(r'#{1,6}\s*', '', text)  # Remove markdown headers
-        text = re.sub(r'\*{1,2}([^*]+)\*{1,2}', r'\1', text)  # Remove bold/italic
-        text = re.sub(r'`([^`]+)`', r'\1', text)  # Remove inline code
+        text = _HEADER_RE.sub('', text)  # Remove markdown headers
+        text = _EMPHASIS_RE.sub(r'\1', text)  # Remove bold/italic
+        text = _INLINE_CODE_RE.sub(r'\1', text)  # Remove inline code
 
         return text.strip()
 
+    def _minhash(self, text: str) -> MinHash:
+        """MinHash signature over lowercase word 3-shingles"""
+        words = text.lower().split()
+        shingles = {" ".join(words[i:i + 3]).encode() for i in range(max(len(words) - 2, 1))}
+        minhash = MinHash(num_perm=128)
+        minhash.update_batch(shingles)
+        return minhash
+
+    def _index_minhash(self, doc_id: str, minhash: MinHash) -> None:
+        if doc_id not in self.lsh:
+            self.lsh.insert(doc_id, minhash)
+
     def _extract_title_from_content(self, content: str) -> str:
         """Extract a meaningful title from content"""
         lines = content.split('\n')
@@ -371,123 +558,80 @@ class IngestionAgent(BaseAgent):
                     return line
         return None
 
-    async def _classify_content_advanced(self, content: str) -> str:
-        """Advanced content classification using Gemini AI"""
+    async def _analyze_content(self, content: str) -> Dict[str, Any]:
+        """Classify content and extract its concepts and relationships in a single Gemini call"""
+        cache_key = xxhash.xxh3_128_hexdigest(content[:3000].encode())
+        cached = self.analysis_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         try:
-            # Use Gemini for intelligent classification
-            classification_prompt = f"""
-            Analyze this content and classify it into one of these categories:
-            - tutorial: Step-by-step instructions, how-to guides
-            - reference: API docs, specifications, technical references  
-            - example: Code samples, demos, use cases
-            - overview: General information, introductions, concepts
-
-            Content preview (first 1000 chars):
-            {content[:1000]}
-
-            Return only the category name.
+            analysis_prompt = f"""
+            Analyze this content and return:
+            - doc_type: one of these categories
+              - tutorial: Step-by-step instructions, how-to guides
+              - reference: API docs, specifications, technical references
+              - example: Code samples, demos, use cases
+              - overview: General information, introductions, concepts
+            - concepts: 5-10 key concepts, terms, or topics. Focus on technical terms, important concepts, and main topics.
+            - relationships: 3-5 meaningful relationships between those concepts, using concept names exactly as listed
+
+            Content preview (first 3000 chars):
+            {content[:3000]}
             """
 
-            response = self.gemini_client.models.generate_content(
-                model="gemini-1.5-flash",
-                contents=classification_prompt,
+            response = await self._call_with_timeout(
+                lambda: self.gemini_client.aio.models.generate_content(
+                    model="gemini-1.5-flash",
+                    contents=analysis_prompt,
+                    config=_ANALYSIS_CONFIG,
+                )
             )
 
-            classification = response.candidates[0].content.parts[0].text.strip().lower()
-
-            # Validate classification
-            valid_types = ["tutorial", "reference", "example", "overview"]
-            if classification in valid_types:
-                return classification
-            else:
-                # Fallback to keyword-based classification
-                return self._classify_content_fallback(content)
+            analysis = orjson.loads(response.candidates[0].content.parts[0].text)
+            if not isinstance(analysis, dict):
+                raise ValueError("Analysis response is not a JSON object")
 
         except Exception as e:
-            logger.warning(f"⚠️ AI classification failed, using fallback: {e}")
-            return self._classify_content_fallback(content)
-
-    def _classify_content_fallback(self, content: str) -> str:
-        """Fallback content classification using keywords"""
-        content_lower = content.lower()
-
-        if "tutorial" in content.lower() or "step by step" in content.lower():
-            return "tutorial"
-        elif "example" in content.lower() or "code sample" in content.lower():
-            return "example"
-        elif "api" in content_lower or "reference" in content_lower or "documentation" in content_lower:
-            return "reference"
-        else:
-            return "overview"
+            logger.warning(f"⚠️ AI content analysis failed, using fallback: {e}")
+            return {"doc_type": self._classify_content_fallback(content), "concepts": [], "relationships": []}
 
-    async def _extract_concepts_and_relationships(self, document: SourceDocument):
-        """Enhanced concept and relationship extraction using Gemini AI"""
-        try:
-            logger.info(f"🧠 Extracting concepts from document: {document.title}")
+        # Validate classification, falling back to keyword-based classification
+        if analysis.get("doc_type") not in _DOC_TYPES:
+            analysis["doc_type"] = self._classify_content_fallback(content)
 
-            # Extract concepts using Gemini
-            concept_prompt = f"""
-            Extract 5-10 key concepts, terms, or topics from this content. 
-            Focus on technical terms, important concepts, and main topics.
-            Return each concept on a separate line, no numbering or bullets.
+        self.analysis_cache[cache_key] = analysis
+        return analysis
 
-            Content: {document.content[:3000]}
-            """
+    def _classify_content_fallback(self, content: str) -> str:
+        """Fallback content classification using keywords"""
+        found = set()
+        for match in _KEYWORD_RE.finditer(content):
+            if match.lastgroup == "tutorial":
+                return "tutorial"  # Highest priority, nothing can outrank it
+            found.add(match.lastgroup)
 
-            response = self.gemini_client.models.generate_content(
-                model="gemini-1.5-flash",
-                contents=concept_prompt,
-            )
+        return next((category for category in _CATEGORY_PRIORITY if category in found), "overview")
 
-            concept_text = response.candidates[0].content.parts[0].text.strip()
-            concepts = [c.strip() for c in concept_text.split('\n') if c.strip() and len(c.strip()) > 2]
+    def _store_concepts_and_relationships(self, document: SourceDocument, analysis: Dict[str, Any]) -> None:
+        """Store the concepts and relationships extracted for a document"""
+        try:
+            concepts = [c.strip() for c in analysis.get("concepts", []) if isinstance(c, str) and len(c.strip()) > 2]
 
             # Store concepts
-            concept_ids = []
-            for concept in concepts[:10]:  # Limit to 10 concepts
-                concept_id = self.memory.store_concept(concept, document.id)
-                concept_ids.append((concept_id, concept))
-
-            # Extract relationships using Gemini
-            if len(concepts) > 1:
-                relationship_prompt = f"""
-                Given these concepts from the same document: {', '.join(concepts[:8])}
-
-                Identify 3-5 meaningful relationships between them.
-                Format: concept1 -> concept2 (relationship_type)
+            concept_ids = self.memory.store_concepts_bulk(concepts[:10], document.id)  # Limit to 10 concepts
 
-                Relationship types: related_to, part_of, enables, requires, implements
-                """
-
-                rel_response = self.gemini_client.models.generate_content(
-                    model="gemini-1.5-flash",
-                    contents=relationship_prompt,
-                )
-
-                rel_text = rel_response.candidates[0].content.parts[0].text.strip()
-
-                # Parse relationships
-                for line in rel_text.split('\n'):
-                    if '->' in line and '(' in line:
-                        try:
-                            parts = line.split('->')
-                            if len(parts) == 2:
-                                concept1 = parts[0].strip()
-                                rest = parts[1].strip()
-                                if '(' in rest:
-                                    concept2 = rest.split('(')[0].strip()
-                                    rel_type = rest.split('(')[1].split(')')[0].strip()
-
-                                    # Store relationship if both concepts exist
-                                    if concept1 in concepts and concept2 in concepts:
-                                        store_relationship(concept1, concept2, rel_type)
-                        except Exception as e:
-                            logger.warning(f"⚠️ Failed to parse relationship: {line} - {e}")
+            # Store relationships whose concepts were both stored
+            relationships = [
+                (rel.get("source", "").strip(), rel.get("target", "").strip(), rel.get("type", "related_to"))
+                for rel in analysis.get("relationships", []) if isinstance(rel, dict)
+            ]
+            self.memory.store_relationships_bulk(relationships, concept_ids)
 
-            logger.info(f"✅ Extracted {len(concepts)} concepts and relationships for {document.title}")
+            logger.info(f"✅ Stored {len(concepts)} concepts and relationships for {document.title}")
 
         except Exception as e:
-            logger.error(f"❌ Failed to extract concepts for {document.id}: {e}")
+            logger.error(f"❌ Failed to store concepts for {document.id}: {e}")
 
     async def _process_document(self, doc_path: str) -> Dict[str, Any]:
         """Process document files (PDF, DOCX, etc.)"""
@@ -1,118 +1,363 @@
-from typing import Any, Dict
-import json
-from datetime import datetime
-from google import genai
+import asyncio
+import io
+import re
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+import orjson
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from types import MappingProxyType
+from google.genai import types
 
 from services.base_agent import BaseAgent
 from services.memory import AgentMemory
+from services.gemini_client import get_gemini_client
+from services.semantic_cache import SemanticCache, cache_scope
 from configuration.configuration import Configuration as Config, logger
 
+# Ask Gemini for a bare JSON object so the plan parses without text cleanup
+_PLANNING_CONFIG = types.GenerateContentConfig(response_mime_type="application/json")
+
+# Section headings of a plain-text plan, in priority order when a line names several
+_SECTION_RE = re.compile(
+    r'.*?(?P<outline>outline)|.*?(?P<objectives>objective)|.*?(?P<concepts>concept)|.*?(?P<notes>note|structure)',
+    re.IGNORECASE
+)
+
+# Bulleted or numbered item, capturing the text after its marker
+_BULLET_RE = re.compile(r'[-*•\d][-*•0-9. ]*(.*)')
+
+
+class _PlanningTemplate(NamedTuple):
+    structure: Tuple[str, ...]
+    structure_len: int
+    objectives_focus: str
+    timing_considerations: bool
+    structure_notes: Tuple[str, ...]
+
+
+def _template(structure: Tuple[str, ...], objectives_focus: str, timing_considerations: bool,
+              structure_notes: Tuple[str, ...]) -> _PlanningTemplate:
+    return _PlanningTemplate(structure, len(structure), objectives_focus, timing_considerations, structure_notes)
+
+
+# Content type specific planning templates
+_TEMPLATES: Mapping[str, _PlanningTemplate] = MappingProxyType({
+    "youtube": _template(
+        ("Hook/Introduction", "Problem Statement", "Main Content", "Examples/Demos", "Call to Action"),
+        "engagement and retention",
+        True,
+        ("Include engaging hook in first 30 seconds",
+         "Add timing markers throughout script",
+         "Include call-to-action at the end")
+    ),
+    "tutorial": _template(
+        ("Prerequisites", "Overview", "Step-by-step Instructions", "Examples", "Troubleshooting", "Next Steps"),
+        "practical application",
+        False,
+        ("Include prerequisites section",
+         "Provide step-by-step instructions",
+         "Add troubleshooting section")
+    ),
+    "book": _template(
+        ("Chapter Introduction", "Theoretical Foundation", "Detailed Explanation", "Case Studies", "Summary"),
+        "comprehensive understanding",
+        False,
+        ("Include chapter introduction and summary",
+         "Provide comprehensive theoretical background",
+         "Include case studies and examples")
+    ),
+    "interactive": _template(
+        ("Learning Objectives", "Interactive Content", "Practice Exercises", "Assessment", "Reflection"),
+        "active learning and assessment",
+        False,
+        ("Include interactive exercises",
+         "Add knowledge check quizzes",
+         "Provide hands-on practice opportunities")
+    )
+})
+
+# Fallback plan outlines and objectives, with a {topic} placeholder filled in when planning fails
+_FALLBACK_OUTLINES = {
+    content_type: tuple(section.replace("Main Content", "{topic} Fundamentals") for section in template.structure)
+    for content_type, template in _TEMPLATES.items()
+}
+_FALLBACK_OBJECTIVES = (
+    "Understand the core concepts of {topic}",
+    "Learn practical applications of {topic}",
+    "Identify best practices and common challenges",
+    "Gain confidence in applying {topic} knowledge"
+)
+
+
+def _build_static_prompt(template: _PlanningTemplate) -> str:
+    """Build the instructions shared by every planning prompt of one content type"""
+    prompt_parts = [
+        "You are planning educational content.",
+        f"Objectives focus: {template.objectives_focus}",
+        "",
+        "Requirements:",
+        f"1. Create a detailed outline with {template.structure_len} main sections",
+        f"2. Generate 4-6 specific learning objectives",
+        f"3. Focus on {template.objectives_focus}",
+        f"4. Consider the target audience level given below",
+        ""
+    ]
+
+    if template.timing_considerations:
+        prompt_parts.append("5. Include timing considerations for video format")
+        prompt_parts.append("")
+
+    # Format instructions
+    prompt_parts.extend([
+        "Format your response as JSON with these keys:",
+        "- outline: array of section titles/descriptions",
+        "- objectives: array of specific learning objectives",
+        "- key_concepts: array of main concepts to cover",
+        "- structure_notes: array of structural guidance",
+        "- estimated_length: 'short', 'medium', or 'long'",
+        "",
+        "Make the plan comprehensive, logical, and appropriate for the content type and audience.",
+        ""
+    ])
+
+    return "\n".join(prompt_parts)
+
+
+# Per-type instruction blocks, byte-identical across calls so they form a cacheable prompt prefix
+_STATIC_PROMPTS: Mapping[str, str] = MappingProxyType({
+    content_type: _build_static_prompt(template) for content_type, template in _TEMPLATES.items()
+})
+
+# Tokens that matter when scanning for a balanced JSON object: escapes, quotes and braces
+_JSON_SCAN_RE = re.compile(r'\\.|["{}]', re.DOTALL)
+
+
+def _extract_first_json(text: str) -> Optional[str]:
+    """Return the first balanced {...} object in the text, skipping braces inside strings"""
+    start = text.find('{')
+    if start < 0:
+        return None
+
+    depth = 0
+    in_string = False
+    for match in _JSON_SCAN_RE.finditer(text, start):
+        token = match.group()
+        if token == '"':
+            in_string = not in_string
+        elif in_string or token[0] == '\\':
+            continue
+        elif token == '{':
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return text[start:match.end()]
+    return None
+
+
+@dataclass(frozen=True, slots=True)
+class PlanningTask:
+    """Planning request fields, read once from the incoming task dict"""
+    topic: Optional[str] = None
+    content_type: str = "tutorial"
+    audience_level: str = "intermediate"
+    constraints: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, task: Dict[str, Any]) -> "PlanningTask":
+        return cls(**{name: task[name] for name in _PLANNING_TASK_FIELDS if name in task})
+
+
+_PLANNING_TASK_FIELDS = tuple(PlanningTask.__dataclass_fields__)
+
 
 class PlanningAgent(BaseAgent):
     def __init__(self, config: Config, memory: AgentMemory):
         super().__init__("PlanningAgent", config, memory)
-        self.gemini_client = genai.Client(api_key=config.gemini_api_key)
-
-        # Content type specific planning templates
-        self.planning_templates = {
-            "youtube": {
-                "structure": ["Hook/Introduction", "Problem Statement", "Main Content", "Examples/Demos",
-                              "Call to Action"],
-                "objectives_focus": "engagement and retention",
-                "timing_considerations": True
-            },
-            "tutorial": {
-                "structure": ["Prerequisites", "Overview", "Step-by-step Instructions", "Examples", "Troubleshooting",
-                              "Next Steps"],
-                "objectives_focus": "practical application",
-                "timing_considerations": False
-            },
-            "book": {
-                "structure": ["Chapter Introduction", "Theoretical Foundation", "Detailed Explanation", "Case Studies",
-                              "Summary"],
-                "objectives_focus": "comprehensive understanding",
-                "timing_considerations": False
-            },
-            "interactive": {
-                "structure": ["Learning Objectives", "Interactive Content", "Practice Exercises", "Assessment",
-                              "Reflection"],
-                "objectives_focus": "active learning and assessment",
-                "timing_considerations": False
-            }
-        }
+        self.gemini_client = get_gemini_client(config.gemini_api_key)
+
+        # Gemini plans for near-identical topics with the same type, audience and constraints
+        self.plan_cache = SemanticCache(
+            memory.embed_query,
+            threshold=config.plan_cache_threshold,
+            ttl_seconds=config.plan_cache_ttl_seconds,
+            max_entries=2000
+        )
 
     async def process(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """Create comprehensive content plan with structure and learning objectives"""
         self.update_status("processing")
         logger.info(f"📋 PlanningAgent creating plan")
 
-        topic = task.get("topic")
-        content_type = task.get("content_type", "tutorial")
-        audience_level = task.get("audience_level", "intermediate")
-        constraints = task.get("constraints", {})
+        plan_task = PlanningTask.from_dict(task)
 
-        if not topic:
+        if not plan_task.topic:
             self.update_status("error")
             return {"status": "error", "message": "Topic is required"}
 
         try:
-            # Get relevant context from memory
-            relevant_content = self.memory.search_relevant_content(topic, n_results=5)
-            context_summary = self._summarize_context(relevant_content)
+            # Create comprehensive planning prompt from the relevant memory context
+            planning_prompt, relevant_content = self._prepare_planning_prompt(plan_task)
+
+            # Generate plan using Gemini, unless a near-identical topic was planned recently
+            cache_topic, cache_scope_key = self._plan_cache_key(plan_task, relevant_content)
+            response_text = self.plan_cache.get(cache_topic, cache_scope_key)
+            cache_hit = response_text is not None
+            if not cache_hit:
+                response_text = await self._call_with_timeout(
+                    lambda: self._generate_plan_text(planning_prompt),
+                    self.config.gemini_generation_timeout_s
+                )
+                self.plan_cache.set(cache_topic, response_text, cache_scope_key)
+
+            result = self._build_plan_result(plan_task, response_text, len(relevant_content), cache_hit)
+            self.update_status("completed")
+            logger.info(f"✅ Plan created: {len(result['outline'])} sections, {len(result['objectives'])} objectives")
+            return result
 
-            # Create comprehensive planning prompt
-            planning_prompt = self._build_planning_prompt(
-                topic, content_type, audience_level, constraints, context_summary
-            )
+        except Exception as e:
+            self.update_status("error")
+            logger.error(f"❌ Planning failed: {e}")
+            return self._build_fallback_result(plan_task.topic, plan_task.content_type, str(e))
 
-            # Generate plan using Gemini
-            response = self.gemini_client.models.generate_content(
-                model="gemini-1.5-flash",
-                contents=planning_prompt,
-            )
+    async def process_many(self, tasks: List[Dict[str, Any]], max_concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Plan several topics concurrently, at most max_concurrency at a time"""
+        semaphore = asyncio.Semaphore(max_concurrency or self.config.gemini_max_concurrency)
 
-            # Parse response
-            plan_data = self._parse_planning_response(response.candidates[0].content.parts[0].text)
+        async def plan(task: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.process(task)
 
-            # Enhance plan with template-specific elements
-            enhanced_plan = self._enhance_plan_with_template(plan_data, content_type, constraints)
+        results = await asyncio.gather(*(plan(task) for task in tasks), return_exceptions=True)
+        return [
+            self._build_fallback_result(task.get("topic"), task.get("content_type", "tutorial"), str(result))
+            if isinstance(result, Exception) else result
+            for task, result in zip(tasks, results)
+        ]
 
-            self.update_status("completed")
-            logger.info(
-                f"✅ Plan created: {len(enhanced_plan.get('outline', []))} sections, {len(enhanced_plan.get('objectives', []))} objectives")
-
-            return {
-                "status": "success",
-                "topic": topic,
-                "content_type": content_type,
-                "outline": enhanced_plan.get("outline", []),
-                "objectives": enhanced_plan.get("objectives", []),
-                "structure_notes": enhanced_plan.get("structure_notes", []),
-                "estimated_length": enhanced_plan.get("estimated_length", "medium"),
-                "key_concepts": enhanced_plan.get("key_concepts", []),
-                "planning_metadata": {
-                    "audience_level": audience_level,
-                    "constraints": constraints,
-                    "context_sources": len(relevant_content),
-                    "planning_timestamp": str(datetime.now())
-                }
-            }
+    async def process_batch(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Plan many topics through one Gemini batch job, for bulk jobs that can wait on the batch queue"""
+        self.update_status("processing")
+        logger.info(f"📋 PlanningAgent creating {len(tasks)} plans in batch mode")
 
-        except Exception as e:
-            self.update_status("error")
-            logger.error(f"❌ Planning failed: {e}")
+        results: List[Optional[Dict[str, Any]]] = [None] * len(tasks)
+        pending = []  # (task index, planning prompt, context source count, plan cache key)
+
+        plan_tasks = [PlanningTask.from_dict(task) for task in tasks]
+        for i, plan_task in enumerate(plan_tasks):
+            if not plan_task.topic:
+                results[i] = {"status": "error", "message": "Topic is required"}
+                continue
+
+            try:
+                planning_prompt, relevant_content = self._prepare_planning_prompt(plan_task)
+            except Exception as e:
+                logger.error(f"❌ Planning failed for {plan_task.topic}: {e}")
+                results[i] = self._build_fallback_result(plan_task.topic, plan_task.content_type, str(e))
+                continue
+
+            cache_key = self._plan_cache_key(plan_task, relevant_content)
+            cached = self.plan_cache.get(*cache_key)
+            if cached is not None:
+                results[i] = self._build_plan_result(plan_task, cached, len(relevant_content), True)
+            else:
+                pending.append((i, planning_prompt, len(relevant_content), cache_key))
+
+        if pending:
+            try:
+                responses = await self._run_batch_job([prompt for _, prompt, _, _ in pending], _PLANNING_CONFIG)
+            except Exception as e:
+                logger.error(f"❌ Batch planning failed: {e}")
+                responses = [None] * len(pending)
+
+            for (i, planning_prompt, context_sources, (topic, scope)), response_text in zip(pending, responses):
+                plan_task = plan_tasks[i]
+                if response_text is None:
+                    results[i] = self._build_fallback_result(
+                        plan_task.topic, plan_task.content_type, "Batch request returned no response"
+                    )
+                    continue
+                self.plan_cache.set(topic, response_text, scope)
+                results[i] = self._build_plan_result(plan_task, response_text, context_sources, False)
+
+        self.update_status("completed")
+        logger.info(f"✅ Batch planning finished: {len(pending)} Gemini requests, {len(tasks) - len(pending)} cached or invalid")
+        return results
+
+    async def _generate_plan_text(self, planning_prompt: str) -> str:
+        """Stream the plan from Gemini into a single string without blocking the event loop"""
+        buffer = io.StringIO()
+        response = await self.gemini_client.aio.models.generate_content_stream(
+            model="gemini-1.5-flash",
+            contents=planning_prompt,
+            config=_PLANNING_CONFIG,
+        )
+
+        async for chunk in response:
+            if chunk.text:
+                buffer.write(chunk.text)
+
+        return buffer.getvalue()
+
+    def _prepare_planning_prompt(self, task: PlanningTask) -> Tuple[str, list]:
+        """Build the planning prompt for a task along with the memory context it draws on"""
+        # Get relevant context from memory
+        relevant_content = self.memory.search_relevant_content(task.topic, n_results=5)
+        context_summary = self._summarize_context(relevant_content)
+
+        planning_prompt = self._build_planning_prompt(
+            task.topic, task.content_type, task.audience_level, task.constraints, context_summary
+        )
+        return planning_prompt, relevant_content
+
+    @staticmethod
+    def _plan_cache_key(task: PlanningTask, relevant_content: list) -> Tuple[str, str]:
+        """
+        Plan cache text and scope: only the topic is embedded, the static prompt prefix is left out.
+        The retrieved context's chunk IDs are part of the scope, so newly stored sources miss the cache.
+        """
+        context_ids = [item.get("id") for item in relevant_content]
+        return task.topic, cache_scope(task.content_type, task.audience_level, task.constraints, context_ids)
+
+    def _build_plan_result(self, task: PlanningTask, response_text: str, context_sources: int,
+                           cache_hit: bool) -> Dict[str, Any]:
+        """Parse a Gemini planning response into the plan returned to callers"""
+        # Parse response
+        plan_data = self._parse_planning_response(response_text)
+
+        # Enhance plan with template-specific elements
+        enhanced_plan = self._enhance_plan_with_template(plan_data, task.content_type, task.constraints)
 
-            # Return fallback plan
-            fallback_plan = self._create_fallback_plan(topic, content_type)
-            return {
-                "status": "success",
-                "topic": topic,
-                "content_type": content_type,
-                "outline": fallback_plan["outline"],
-                "objectives": fallback_plan["objectives"],
-                "structure_notes": ["Generated using fallback planning due to AI planning failure"],
-                "error": str(e)
+        return {
+            "status": "success",
+            "topic": task.topic,
+            "content_type": task.content_type,
+            "outline": enhanced_plan.get("outline", []),
+            "objectives": enhanced_plan.get("objectives", []),
+            "structure_notes": enhanced_plan.get("structure_notes", []),
+            "estimated_length": enhanced_plan.get("estimated_length", "medium"),
+            "key_concepts": enhanced_plan.get("key_concepts", []),
+            "planning_metadata": {
+                "audience_level": task.audience_level,
+                "constraints": task.constraints,
+                "context_sources": context_sources,
+                "cache_hit": cache_hit,
+                "planning_timestamp": datetime.now(timezone.utc).isoformat()
             }
+        }
+
+    def _build_fallback_result(self, topic: str, content_type: str, error: str) -> Dict[str, Any]:
+        """Fallback plan result when AI planning fails"""
+        fallback_plan = self._create_fallback_plan(topic, content_type)
+        return {
+            "status": "success",
+            "topic": topic,
+            "content_type": content_type,
+            "outline": fallback_plan["outline"],
+            "objectives": fallback_plan["objectives"],
+            "structure_notes": ["Generated using fallback planning due to AI planning failure"],
+            "error": error
+        }
 
     def _summarize_context(self, relevant_content: list) -> str:
         """Summarize relevant context for planning"""
@@ -130,26 +375,17 @@ class PlanningAgent(BaseAgent):
 
     def _build_planning_prompt(self, topic: str, content_type: str, audience_level: str,
                                constraints: dict, context: str) -> str:
-        """Build comprehensive planning prompt"""
-
-        template = self.planning_templates.get(content_type, self.planning_templates["tutorial"])
+        """Build comprehensive planning prompt, static instructions first so Gemini can cache the prefix"""
+        static_prompt = _STATIC_PROMPTS.get(content_type, _STATIC_PROMPTS["tutorial"])
 
         prompt_parts = [
+            static_prompt,
             f"Create a detailed content plan for: {topic}",
             f"Content type: {content_type}",
             f"Target audience: {audience_level}",
-            f"Objectives focus: {template['objectives_focus']}",
             ""
         ]
 
-        # Add context if available
-        if context and context != "No relevant context available":
-            prompt_parts.extend([
-                "Reference material context:",
-                context[:1500],  # Limit context length
-                ""
-            ])
-
         # Add constraints
         if constraints:
             constraint_text = []
@@ -167,94 +403,63 @@ class PlanningAgent(BaseAgent):
                     ""
                 ])
 
-        # Add specific requirements
-        prompt_parts.extend([
-            "Requirements:",
-            f"1. Create a detailed outline with {len(template['structure'])} main sections",
-            f"2. Generate 4-6 specific learning objectives",
-            f"3. Consider {audience_level} audience level",
-            f"4. Focus on {template['objectives_focus']}",
-            ""
-        ])
-
-        if template.get('timing_considerations'):
-            prompt_parts.append("5. Include timing considerations for video format")
-            prompt_parts.append("")
-
-        # Format instructions
-        prompt_parts.extend([
-            "Format your response as JSON with these keys:",
-            "- outline: array of section titles/descriptions",
-            "- objectives: array of specific learning objectives",
-            "- key_concepts: array of main concepts to cover",
-            "- structure_notes: array of structural guidance",
-            "- estimated_length: 'short', 'medium', or 'long'",
-            "",
-            "Make the plan comprehensive, logical, and appropriate for the content type and audience."
-        ])
+        # Add context if available
+        if context and context != "No relevant context available":
+            prompt_parts.extend([
+                "Reference material context:",
+                context[:1500]  # Limit context length
+            ])
 
         return "\n".join(prompt_parts)
 
     def _parse_planning_response(self, response_text: str) -> dict:
         """Parse Gemini response into structured plan data"""
         try:
-            # Try to extract JSON from response
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
+            # JSON mode returns the object itself; otherwise extract the first one from the response
+            json_text = _extract_first_json(response_text)
 
-            if json_start >= 0 and json_end > json_start:
-                json_text = response_text[json_start:json_end]
-                return json.loads(json_text)
-            else:
-                # Fallback: parse structured text
-                return self._parse_structured_text(response_text)
+            if json_text is not None:
+                plan_data = orjson.loads(json_text)
+                if isinstance(plan_data, dict):
+                    return plan_data
 
-        except json.JSONDecodeError:
+            # Fallback: parse structured text
+            return self._parse_structured_text(response_text)
+
+        except orjson.JSONDecodeError:
             logger.warning("⚠️ Failed to parse JSON response, using text parsing")
             return self._parse_structured_text(response_text)
 
     def _parse_structured_text(self, text: str) -> dict:
         """Parse structured text response when JSON parsing fails"""
-        lines = text.split('\n')
-
         outline = []
         objectives = []
         key_concepts = []
         structure_notes = []
 
-        current_section = None
+        section_items = {
+            "outline": outline.append,
+            "objectives": objectives.append,
+            "concepts": key_concepts.append,
+            "notes": structure_notes.append
+        }
+        add_item = None
 
-        for line in lines:
+        for line in text.split('\n'):
             line = line.strip()
             if not line:
                 continue
 
             # Detect sections
-            if 'outline' in line.lower():
-                current_section = 'outline'
-                continue
-            elif 'objective' in line.lower():
-                current_section = 'objectives'
-                continue
-            elif 'concept' in line.lower():
-                current_section = 'concepts'
-                continue
-            elif 'note' in line.lower() or 'structure' in line.lower():
-                current_section = 'notes'
+            section = _SECTION_RE.match(line)
+            if section:
+                add_item = section_items[section.lastgroup]
                 continue
 
             # Extract content based on current section
-            if line.startswith(('-', '*', '•')) or line[0].isdigit():
-                content = line.lstrip('-*•0123456789. ')
-
-                if current_section == 'outline':
-                    outline.append(content)
-                elif current_section == 'objectives':
-                    objectives.append(content)
-                elif current_section == 'concepts':
-                    key_concepts.append(content)
-                elif current_section == 'notes':
-                    structure_notes.append(content)
+            bullet = _BULLET_RE.match(line)
+            if bullet and add_item:
+                add_item(bullet.group(1))
 
         return {
             "outline": outline,
@@ -266,11 +471,11 @@ class PlanningAgent(BaseAgent):
 
     def _enhance_plan_with_template(self, plan_data: dict, content_type: str, constraints: dict) -> dict:
         """Enhance plan with content type specific elements"""
-        template = self.planning_templates.get(content_type, self.planning_templates["tutorial"])
+        template = _TEMPLATES.get(content_type, _TEMPLATES["tutorial"])
 
         # Ensure minimum outline structure
         if len(plan_data.get("outline", [])) < 3:
-            plan_data["outline"] = template["structure"]
+            plan_data["outline"] = list(template.structure)
 
         # Ensure minimum objectives
         if len(plan_data.get("objectives", [])) < 3:
@@ -283,30 +488,8 @@ class PlanningAgent(BaseAgent):
             plan_data["objectives"] = default_objectives
 
         # Add content type specific enhancements
-        if content_type == "youtube":
-            plan_data["structure_notes"] = plan_data.get("structure_notes", []) + [
-                "Include engaging hook in first 30 seconds",
-                "Add timing markers throughout script",
-                "Include call-to-action at the end"
-            ]
-        elif content_type == "tutorial":
-            plan_data["structure_notes"] = plan_data.get("structure_notes", []) + [
-                "Include prerequisites section",
-                "Provide step-by-step instructions",
-                "Add troubleshooting section"
-            ]
-        elif content_type == "book":
-            plan_data["structure_notes"] = plan_data.get("structure_notes", []) + [
-                "Include chapter introduction and summary",
-                "Provide comprehensive theoretical background",
-                "Include case studies and examples"
-            ]
-        elif content_type == "interactive":
-            plan_data["structure_notes"] = plan_data.get("structure_notes", []) + [
-                "Include interactive exercises",
-                "Add knowledge check quizzes",
-                "Provide hands-on practice opportunities"
-            ]
+        if content_type in _TEMPLATES:
+            plan_data["structure_notes"] = [*plan_data.get("structure_notes", []), *template.structure_notes]
 
         # Apply constraints
         if constraints.get("length") == "short":
@@ -319,18 +502,11 @@ class PlanningAgent(BaseAgent):
 
     def _create_fallback_plan(self, topic: str, content_type: str) -> dict:
         """Create fallback plan when AI planning fails"""
-        template = self.planning_templates.get(content_type, self.planning_templates["tutorial"])
-
-        # Create basic outline based on template
-        outline = [section.replace("Main Content", f"{topic} Fundamentals") for section in template["structure"]]
+        outline_templates = _FALLBACK_OUTLINES.get(content_type, _FALLBACK_OUTLINES["tutorial"])
 
-        # Create basic objectives
-        objectives = [
-            f"Understand the core concepts of {topic}",
-            f"Learn practical applications of {topic}",
-            f"Identify best practices and common challenges",
-            f"Gain confidence in applying {topic} knowledge"
-        ]
+        # Fill the precomputed outline and objectives with the topic
+        outline = [section.format(topic=topic) for section in outline_templates]
+        objectives = [objective.format(topic=topic) for objective in _FALLBACK_OBJECTIVES]
 
         return {
             "outline": outline,
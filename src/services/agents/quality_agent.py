@@ -1,18 +1,145 @@
-from typing import Any, Dict
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
 import textstat
 import re
-from datetime import datetime
-from google import genai
+from datetime import datetime, timezone
+from functools import lru_cache
+from google.genai import errors, types
+from cachetools import TTLCache
 
 from services.base_agent import BaseAgent
 from services.memory import AgentMemory
+from services.gemini_client import get_gemini_client
 from configuration.configuration import Configuration as Config, logger
 
+# Scoring runs in the background pipeline and can wait, so it uses the cheaper Flex tier
+_FLEX_CONFIG = types.GenerateContentConfig(service_tier=types.ServiceTier.FLEX)
+
+# Status codes for Flex requests shed under load, retried on the Standard tier
+_SHED_STATUS_CODES = {429, 503}
+
+# Drafts shorter than this, or without any technical markers, get the heuristic accuracy check instead of Gemini
+_MIN_AI_ACCURACY_WORDS = 200
+_TECHNICAL_RE = re.compile(r'```|\b(?:function|class|API|error)\b', re.IGNORECASE)
+
+# Local accuracy markers; only drafts with enough positive evidence and no negative markers skip the Gemini
+# rating. Negative markers just send a draft to Gemini, since words like "error" are normal in tutorials
+_NEGATIVE_MARKERS_RE = re.compile(r'\b(?:error|deprecated|incorrect|wrong|fix\s+me|TODO)\b', re.IGNORECASE)
+_POSITIVE_MARKERS_RE = re.compile(r'\b(?:according to|RFC\s*\d+|documented|spec)\b', re.IGNORECASE)
+_MIN_POSITIVE_MARKERS = 2
+
+# Text metric patterns; the engagement and step patterns expect lowercased content
+_SENTENCE_RE = re.compile(r'[^.!?\s][^.!?]*')  # Non-blank run between terminators
+_RATING_RE = re.compile(r'0\.\d+|1\.0|0\.0')
+_ENGAGEMENT_RE = re.compile(
+    r'(?P<examples>\bexample\b|\bfor instance\b)'
+    r'|(?P<action_words>\b(?:let\'s|try|practice|implement|build|create)\b)'
+    r'|(?P<personal_pronouns>\b(?:you|your|we|our)\b)'
+)
+_HEADER_RE = re.compile(r'^#+\s', re.MULTILINE)
+_LIST_ITEM_RE = re.compile(r'^\s*[-*+]\s|\d+\.\s', re.MULTILINE)
+_CODE_RE = re.compile(r'```|`[^`]+`')
+_TIMING_MARKER_RE = re.compile(r'\[\d{2}:\d{2}\]')
+_STEP_RE = re.compile(r'step \d+|^\d+\.', re.MULTILINE)
+
+# Structural markers per content type (lowercased content); each kind present adds to the structure score
+_STRUCTURE_MARKERS = {
+    "youtube": (_TIMING_MARKER_RE, re.compile(r'show on screen|cut to|visual')),
+    "tutorial": (_STEP_RE, _CODE_RE),
+    "book": (_HEADER_RE, re.compile(r'^###+\s', re.MULTILINE)),
+    "interactive": (re.compile(r'quiz|question \d+'), re.compile(r'exercise|practice|try')),
+}
+
+
+def _compliance_check(pattern: str, description: str) -> Tuple[re.Pattern, str]:
+    return re.compile(pattern, re.MULTILINE), description
+
+
+# Content type compliance checks, matched against lowercased content
+_COMPLIANCE_CHECKS = {
+    "youtube": (
+        _compliance_check(r'\[\d{2}:\d{2}\]', "timing markers"),
+        _compliance_check(r'welcome|hello|today', "conversational opening"),
+        _compliance_check(r'subscribe|like|comment', "engagement calls")
+    ),
+    "tutorial": (
+        _compliance_check(r'step \d+|^\d+\.', "numbered steps"),
+        _compliance_check(r'```|`[^`]+`', "code examples"),
+        _compliance_check(r'prerequisite|requirement', "prerequisites")
+    ),
+    "book": (
+        _compliance_check(r'^#+\s', "chapter structure"),
+        _compliance_check(r'introduction|conclusion', "academic structure"),
+        _compliance_check(r'figure|table|reference', "academic elements")
+    ),
+    "interactive": (
+        _compliance_check(r'quiz|question', "interactive elements"),
+        _compliance_check(r'exercise|practice', "hands-on activities"),
+        _compliance_check(r'objective|goal', "learning objectives")
+    )
+}
+
+# Expected word counts by content type
+_EXPECTED_WORD_COUNTS = {
+    "youtube": (800, 1500),  # 5-10 minute script
+    "tutorial": (1200, 3000),  # Comprehensive tutorial
+    "book": (2000, 5000),  # Book chapter
+    "interactive": (1000, 2500)  # Interactive content
+}
+
+# Content type specific engagement factors
+_ENGAGEMENT_FACTORS = {
+    "youtube": {"questions": 2, "personal_pronouns": 2, "exclamations": 1.5},
+    "tutorial": {"examples": 2, "action_words": 2, "questions": 1.5},
+    "book": {"examples": 1.5, "questions": 1.2, "action_words": 1},
+    "interactive": {"questions": 2.5, "action_words": 2, "examples": 1.5}
+}
+
+# Overall score weights per metric
+_OVERALL_WEIGHTS = {
+    "accuracy": 0.25,
+    "completeness": 0.20,
+    "readability": 0.15,
+    "engagement": 0.15,
+    "structure": 0.15,
+    "factual_consistency": 0.10
+}
+
+# Points below the pass mark a best-case score must fall before Gemini ratings are skipped
+_DECIDED_SCORE_MARGIN = 5.0
+
+# Content excerpt length sent with rating prompts
+_PROMPT_EXCERPT_CHARS = 2500
+
+
+def _excerpt(content: str) -> str:
+    """Leading excerpt of the content, cut at a word boundary rather than mid-word"""
+    if len(content) <= _PROMPT_EXCERPT_CHARS:
+        return content
+    cut = content.rfind(' ', 0, _PROMPT_EXCERPT_CHARS + 1)
+    return content[:cut if cut > 0 else _PROMPT_EXCERPT_CHARS]
+
+
+def _local_accuracy_score(content: str) -> Optional[float]:
+    """Marker-based accuracy estimate, or None when the markers are not conclusive"""
+    if _NEGATIVE_MARKERS_RE.search(content):
+        return None
+    positive_hits = len(_POSITIVE_MARKERS_RE.findall(content))
+    if positive_hits < _MIN_POSITIVE_MARKERS:
+        return None
+    return min(1.0, 0.9 + 0.05 * positive_hits)
+
+
+@lru_cache(maxsize=512)
+def _readability_scores(content: str) -> Tuple[float, float]:
+    """Flesch reading ease and grade level, cached so re-scoring an unchanged draft is free"""
+    return textstat.flesch_reading_ease(content), textstat.flesch_kincaid_grade(content)
+
 
 class QualityAgent(BaseAgent):
     def __init__(self, config: Config, memory: AgentMemory):
         super().__init__("QualityAgent", config, memory)
-        self.gemini_client = genai.Client(api_key=config.gemini_api_key)
+        self.gemini_client = get_gemini_client(config.gemini_api_key)
 
         # Quality thresholds
         self.thresholds = {
@@ -23,7 +150,13 @@ class QualityAgent(BaseAgent):
             "min_overall": config.min_quality_score
         }
 
-    async def process(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        # Gemini ratings by prompt, so re-scoring an unchanged draft in the revise loop skips the call
+        self.rating_cache = TTLCache(maxsize=1024, ttl=3600)
+
+        # How often accuracy was scored locally instead of by Gemini
+        self.accuracy_stats = {"local": 0, "gemini": 0}
+
+    async def process(self, task: Dict[str, Any], text_metrics: Optional[Tuple[float, ...]] = None) -> Dict[str, Any]:
         """Comprehensive quality assessment with detailed metrics and recommendations"""
         self.update_status("processing")
         logger.info(f"🔍 QualityAgent starting assessment")
@@ -38,7 +171,7 @@ class QualityAgent(BaseAgent):
 
         try:
             # Comprehensive quality assessment
-            metrics = await self._assess_all_metrics(content, content_type, topic)
+            metrics = await self._assess_all_metrics(content, content_type, topic, text_metrics)
 
             # Generate recommendations
             recommendations = self._generate_recommendations(metrics, content_type)
@@ -74,7 +207,7 @@ class QualityAgent(BaseAgent):
                 },
                 "recommendations": recommendations,
                 "meets_quality_standards": meets_standards,
-                "assessment_timestamp": str(datetime.now())
+                "assessment_timestamp": datetime.now(timezone.utc).isoformat()
             }
 
         except Exception as e:
@@ -86,27 +219,63 @@ class QualityAgent(BaseAgent):
                 "quality_metrics": self._get_fallback_metrics()
             }
 
-    async def _assess_all_metrics(self, content: str, content_type: str, topic: str) -> Dict[str, float]:
+    async def process_batch(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Assess many drafts, collecting their Gemini ratings through one batch job first"""
+        # Local metrics first, so only drafts whose ratings can change the outcome are queued for rating
+        drafts = [i for i, task in enumerate(tasks) if task.get("content")]
+        text_metrics = dict(zip(drafts, await asyncio.gather(*(
+            asyncio.to_thread(self._assess_text_metrics, tasks[i]["content"], tasks[i].get("content_type", "unknown"),
+                              len(tasks[i]["content"].split()))
+            for i in drafts
+        ))))
+
+        prompts = []
+        for i in drafts:
+            readability, _, completeness, engagement, structure, _ = text_metrics[i]
+            if self._outcome_decided_locally(readability, completeness, engagement, structure):
+                continue
+            task, content = tasks[i], tasks[i]["content"]
+            if self._local_accuracy(content, len(content.split())) is None:
+                prompts.append(self._accuracy_prompt(content, task.get("topic", "")))
+            prompts.append(self._consistency_prompt(content))
+
+        pending = [prompt for prompt in dict.fromkeys(prompts) if prompt not in self.rating_cache]
+        if pending:
+            try:
+                responses = await self._run_batch_job(pending)
+                for prompt, rating_text in zip(pending, responses):
+                    if rating_text is not None:
+                        self.rating_cache[prompt] = rating_text.strip()
+            except Exception as e:
+                logger.error(f"❌ Batch quality rating failed, rating drafts individually: {e}")
+
+        # Ratings are now cached and local metrics computed, so each assessment only combines them
+        return list(await asyncio.gather(*(self.process(task, text_metrics.get(i)) for i, task in enumerate(tasks))))
+
+    async def _assess_all_metrics(self, content: str, content_type: str, topic: str,
+                                  text_metrics: Optional[Tuple[float, ...]] = None) -> Dict[str, float]:
         """Comprehensive assessment of all quality metrics"""
 
         # Basic text metrics
         word_count = len(content.split())
-        sentences = re.split(r'[.!?]+', content)
-        sentence_count = len([s for s in sentences if s.strip()])
+        sentence_count = sum(1 for _ in _SENTENCE_RE.finditer(content))
         paragraph_count = len([p for p in content.split('\n\n') if p.strip()])
         avg_sentence_length = word_count / max(sentence_count, 1)
 
-        # Readability metrics
-        readability = textstat.flesch_reading_ease(content)
-        reading_level = textstat.flesch_kincaid_grade(content)
+        # Local text metrics first, off the event loop, unless the batch path already computed them
+        if text_metrics is None:
+            text_metrics = await asyncio.to_thread(self._assess_text_metrics, content, content_type, word_count)
+        readability, reading_level, completeness, engagement, structure, content_type_compliance = text_metrics
 
-        # AI-powered assessments
-        accuracy = await self._assess_technical_accuracy(content, topic)
-        completeness = self._assess_completeness(content, content_type)
-        engagement = self._assess_engagement(content, content_type)
-        structure = self._assess_structure(content, content_type)
-        factual_consistency = await self._assess_factual_consistency(content)
-        content_type_compliance = self._assess_content_type_compliance(content, content_type)
+        # Skip the AI-powered assessments when no rating could change whether the content passes
+        if self._outcome_decided_locally(readability, completeness, engagement, structure):
+            logger.debug("Quality outcome decided by local metrics, skipping Gemini ratings")
+            accuracy, factual_consistency = self._fallback_accuracy_check(content), 0.8
+        else:
+            accuracy, factual_consistency = await asyncio.gather(
+                self._assess_technical_accuracy(content, topic, word_count),
+                self._assess_factual_consistency(content)
+            )
 
         return {
             "word_count": word_count,
@@ -123,11 +292,71 @@ class QualityAgent(BaseAgent):
             "content_type_compliance": content_type_compliance
         }
 
-    async def _assess_technical_accuracy(self, content: str, topic: str) -> float:
+    def _outcome_decided_locally(self, readability: float, completeness: float, engagement: float,
+                                 structure: float) -> bool:
+        """True when the overall score passes even with zero ratings, or falls clearly short even with perfect ones"""
+        local_metrics = {"readability": readability, "completeness": completeness,
+                         "engagement": engagement, "structure": structure}
+        pessimistic = self._calculate_overall_score({**local_metrics, "accuracy": 0.0, "factual_consistency": 0.0})
+        optimistic = self._calculate_overall_score({**local_metrics, "accuracy": 1.0, "factual_consistency": 1.0})
+
+        min_overall = self.thresholds["min_overall"]
+        return pessimistic >= min_overall or optimistic < min_overall - _DECIDED_SCORE_MARGIN
+
+    def _assess_text_metrics(self, content: str, content_type: str, word_count: int) -> Tuple[float, ...]:
+        """Readability, completeness, engagement, structure and type compliance, all computed locally"""
+        readability, reading_level = _readability_scores(content)
+        content_lower = content.lower()
+        return (
+            readability,
+            reading_level,
+            self._assess_completeness(content_lower, content_type, word_count),
+            self._assess_engagement(content_lower, content_type, word_count),
+            self._assess_structure(content_lower, content_type),
+            self._assess_content_type_compliance(content_lower, content_type)
+        )
+
+    async def _assess_technical_accuracy(self, content: str, topic: str, word_count: int) -> float:
         """AI-powered technical accuracy assessment"""
+        local_score = self._local_accuracy(content, word_count)
+        if local_score is not None:
+            self.accuracy_stats["local"] += 1
+            logger.debug(f"Accuracy scored locally ({self.accuracy_stats['local']} local, "
+                         f"{self.accuracy_stats['gemini']} Gemini)")
+            return local_score
+
+        self.accuracy_stats["gemini"] += 1
+        try:
+            accuracy_text = await self._rate_with_gemini(self._accuracy_prompt(content, topic))
+            accuracy = float(_RATING_RE.search(accuracy_text).group())
+            return max(0.0, min(1.0, accuracy))
+
+        except Exception as e:
+            logger.warning(f"⚠️ AI accuracy assessment failed: {e}")
+            return self._fallback_accuracy_check(content)
+
+    async def _assess_factual_consistency(self, content: str) -> float:
+        """Check for internal factual consistency"""
         try:
-            accuracy_prompt = f"""
-            Assess the technical accuracy of this content about "{topic}".
+            consistency_text = await self._rate_with_gemini(self._consistency_prompt(content))
+            consistency = float(_RATING_RE.search(consistency_text).group())
+            return max(0.0, min(1.0, consistency))
+
+        except Exception as e:
+            logger.warning(f"⚠️ Consistency assessment failed: {e}")
+            return 0.8  # Default reasonable score
+
+    def _local_accuracy(self, content: str, word_count: int) -> Optional[float]:
+        """Accuracy score when local checks are conclusive, None when the draft needs a Gemini rating"""
+        if word_count < _MIN_AI_ACCURACY_WORDS or not _TECHNICAL_RE.search(content):
+            return self._fallback_accuracy_check(content)
+
+        return _local_accuracy_score(content)
+
+    @staticmethod
+    def _accuracy_prompt(content: str, topic: str) -> str:
+        return f"""
+            Assess the technical accuracy of the content below.
 
             Rate on a scale of 0.0 to 1.0 based on:
             - Factual correctness
@@ -135,29 +364,17 @@ class QualityAgent(BaseAgent):
             - Absence of misleading information
             - Consistency with established knowledge
 
-            Content: {content[:2500]}
-
             Return only a decimal number between 0.0 and 1.0.
-            """
 
-            response = self.gemini_client.models.generate_content(
-                model="gemini-1.5-flash",
-                contents=accuracy_prompt,
-            )
-
-            accuracy_text = response.candidates[0].content.parts[0].text.strip()
-            accuracy = float(re.search(r'0\.\d+|1\.0|0\.0', accuracy_text).group())
-            return max(0.0, min(1.0, accuracy))
+            Topic: {topic}
 
-        except Exception as e:
-            logger.warning(f"⚠️ AI accuracy assessment failed: {e}")
-            return self._fallback_accuracy_check(content)
+            Content: {_excerpt(content)}
+            """
 
-    async def _assess_factual_consistency(self, content: str) -> float:
-        """Check for internal factual consistency"""
-        try:
-            consistency_prompt = f"""
-            Check this content for internal consistency and logical flow.
+    @staticmethod
+    def _consistency_prompt(content: str) -> str:
+        return f"""
+            Check the content below for internal consistency and logical flow.
 
             Rate on a scale of 0.0 to 1.0 based on:
             - No contradictory statements
@@ -165,37 +382,47 @@ class QualityAgent(BaseAgent):
             - Consistent terminology usage
             - Coherent narrative flow
 
-            Content: {content[:2500]}
-
             Return only a decimal number between 0.0 and 1.0.
+
+            Content: {_excerpt(content)}
             """
 
-            response = self.gemini_client.models.generate_content(
-                model="gemini-1.5-flash",
-                contents=consistency_prompt,
+    async def _rate_with_gemini(self, prompt: str) -> str:
+        """Run a rating prompt on the Flex tier, falling back to Standard if the request is shed or times out"""
+        cached = self.rating_cache.get(prompt)
+        if cached is not None:
+            return cached
+
+        try:
+            # One Flex attempt with the long timeout, since Flex requests may queue; shed or slow ones go to Standard
+            response = await self._call_with_timeout(
+                lambda: self.gemini_client.aio.models.generate_content(
+                    model="gemini-1.5-flash",
+                    contents=prompt,
+                    config=_FLEX_CONFIG,
+                ),
+                self.config.gemini_generation_timeout_s,
+                retries=0,
+                rate_limit_retries=0
+            )
+        except (errors.APIError, asyncio.TimeoutError) as e:
+            if isinstance(e, errors.APIError) and e.code not in _SHED_STATUS_CODES:
+                raise
+            logger.warning(f"⚠️ Flex request shed ({getattr(e, 'code', 'timeout')}), retrying on Standard tier")
+            response = await self._call_with_timeout(
+                lambda: self.gemini_client.aio.models.generate_content(
+                    model="gemini-1.5-flash",
+                    contents=prompt,
+                )
             )
 
-            consistency_text = response.candidates[0].content.parts[0].text.strip()
-            consistency = float(re.search(r'0\.\d+|1\.0|0\.0', consistency_text).group())
-            return max(0.0, min(1.0, consistency))
+        rating_text = response.candidates[0].content.parts[0].text.strip()
+        self.rating_cache[prompt] = rating_text
+        return rating_text
 
-        except Exception as e:
-            logger.warning(f"⚠️ Consistency assessment failed: {e}")
-            return 0.8  # Default reasonable score
-
-    def _assess_completeness(self, content: str, content_type: str) -> float:
+    def _assess_completeness(self, content_lower: str, content_type: str, word_count: int) -> float:
         """Assess content completeness based on type and length"""
-        word_count = len(content.split())
-
-        # Expected word counts by content type
-        expected_lengths = {
-            "youtube": (800, 1500),  # 5-10 minute script
-            "tutorial": (1200, 3000),  # Comprehensive tutorial
-            "book": (2000, 5000),  # Book chapter
-            "interactive": (1000, 2500)  # Interactive content
-        }
-
-        min_words, max_words = expected_lengths.get(content_type, (500, 2000))
+        min_words, max_words = _EXPECTED_WORD_COUNTS.get(content_type, (500, 2000))
 
         # Length-based completeness
         if word_count < min_words * 0.5:
@@ -208,123 +435,66 @@ class QualityAgent(BaseAgent):
             length_score = 0.9  # Slightly penalize excessive length
 
         # Structure-based completeness
-        has_intro = any(word in content.lower()[:500] for word in ["introduction", "welcome", "overview", "begin"])
-        has_conclusion = any(word in content.lower()[-500:] for word in ["conclusion", "summary", "recap", "end"])
-        has_examples = "example" in content.lower() or "for instance" in content.lower()
+        opening, closing = content_lower[:500], content_lower[-500:]
+        has_intro = any(word in opening for word in ("introduction", "welcome", "overview", "begin"))
+        has_conclusion = any(word in closing for word in ("conclusion", "summary", "recap", "end"))
+        has_examples = "example" in content_lower or "for instance" in content_lower
 
         structure_score = (has_intro + has_conclusion + has_examples) / 3
 
         return (length_score * 0.7) + (structure_score * 0.3)
 
-    def _assess_engagement(self, content: str, content_type: str) -> float:
+    def _assess_engagement(self, content_lower: str, content_type: str, word_count: int) -> float:
         """Assess content engagement potential"""
         engagement_indicators = {
-            "questions": len(re.findall(r'\?', content)),
-            "examples": len(re.findall(r'\bexample\b|\bfor instance\b', content, re.IGNORECASE)),
-            "action_words": len(
-                re.findall(r'\b(let\'s|try|practice|implement|build|create)\b', content, re.IGNORECASE)),
-            "personal_pronouns": len(re.findall(r'\b(you|your|we|our)\b', content, re.IGNORECASE)),
-            "exclamations": len(re.findall(r'!', content))
+            "questions": content_lower.count('?'),
+            "examples": 0,
+            "action_words": 0,
+            "personal_pronouns": 0,
+            "exclamations": content_lower.count('!')
         }
 
-        # Content type specific engagement factors
-        type_factors = {
-            "youtube": {"questions": 2, "personal_pronouns": 2, "exclamations": 1.5},
-            "tutorial": {"examples": 2, "action_words": 2, "questions": 1.5},
-            "book": {"examples": 1.5, "questions": 1.2, "action_words": 1},
-            "interactive": {"questions": 2.5, "action_words": 2, "examples": 1.5}
-        }
+        # One scan counts examples, action words and pronouns; their words never overlap
+        for match in _ENGAGEMENT_RE.finditer(content_lower):
+            engagement_indicators[match.lastgroup] += 1
 
-        factors = type_factors.get(content_type, {})
+        factors = _ENGAGEMENT_FACTORS.get(content_type, {})
 
         # Calculate weighted engagement score
         total_score = 0
-        word_count = len(content.split())
+        per_hundred_words = max(word_count / 100, 1)
 
         for indicator, count in engagement_indicators.items():
-            normalized_count = count / max(word_count / 100, 1)  # Per 100 words
+            normalized_count = count / per_hundred_words  # Per 100 words
             weight = factors.get(indicator, 1)
             total_score += normalized_count * weight
 
         # Normalize to 0-1 scale
         return min(1.0, total_score / 10)
 
-    def _assess_structure(self, content: str, content_type: str) -> float:
+    def _assess_structure(self, content_lower: str, content_type: str) -> float:
         """Assess content structure and organization"""
 
         # Count structural elements
-        headers = len(re.findall(r'^#+\s', content, re.MULTILINE))
-        lists = len(re.findall(r'^\s*[-*+]\s|\d+\.\s', content, re.MULTILINE))
-        code_blocks = len(re.findall(r'```|`[^`]+`', content))
-
-        # Content type specific structure requirements
-        structure_requirements = {
-            "youtube": {
-                "timing_markers": len(re.findall(r'\[\d{2}:\d{2}\]', content)),
-                "visual_cues": len(re.findall(r'show on screen|cut to|visual', content, re.IGNORECASE))
-            },
-            "tutorial": {
-                "steps": len(re.findall(r'step \d+|^\d+\.', content, re.IGNORECASE | re.MULTILINE)),
-                "code_examples": code_blocks
-            },
-            "book": {
-                "sections": headers,
-                "subsections": len(re.findall(r'^###+\s', content, re.MULTILINE))
-            },
-            "interactive": {
-                "quizzes": len(re.findall(r'quiz|question \d+', content, re.IGNORECASE)),
-                "exercises": len(re.findall(r'exercise|practice|try', content, re.IGNORECASE))
-            },
-        }
+        headers = len(_HEADER_RE.findall(content_lower))
+        lists = len(_LIST_ITEM_RE.findall(content_lower))
 
         # Calculate structure score
         base_score = min(1.0, (headers + lists) / 5)  # Basic structure
 
-        # Type-specific bonus
-        type_reqs = structure_requirements.get(content_type, {})
-        type_score = 0
-
-        for req, count in type_reqs.items():
-            if count > 0:
-                type_score += 0.2
+        # Type-specific bonus for each kind of structural marker present
+        type_score = 0.2 * sum(1 for pattern in _STRUCTURE_MARKERS.get(content_type, ()) if pattern.search(content_lower))
 
         return min(1.0, base_score + type_score)
 
-    def _assess_content_type_compliance(self, content: str, content_type: str) -> float:
+    def _assess_content_type_compliance(self, content_lower: str, content_type: str) -> float:
         """Assess how well content matches its intended type"""
 
-        compliance_checks = {
-            "youtube": [
-                (r'\[\d{2}:\d{2}\]', "timing markers"),
-                (r'welcome|hello|today', "conversational opening"),
-                (r'subscribe|like|comment', "engagement calls")
-            ],
-            "tutorial": [
-                (r'step \d+|^\d+\.', "numbered steps"),
-                (r'```|`[^`]+`', "code examples"),
-                (r'prerequisite|requirement', "prerequisites")
-            ],
-            "book": [
-                (r'^#+\s', "chapter structure"),
-                (r'introduction|conclusion', "academic structure"),
-                (r'figure|table|reference', "academic elements")
-            ],
-            "interactive": [
-                (r'quiz|question', "interactive elements"),
-                (r'exercise|practice', "hands-on activities"),
-                (r'objective|goal', "learning objectives")
-            ]
-        }
-
-        checks = compliance_checks.get(content_type, [])
+        checks = _COMPLIANCE_CHECKS.get(content_type, ())
         if not checks:
             return 0.8  # Default score for unknown types
 
-        passed_checks = 0
-        for pattern, description in checks:
-            if re.search(pattern, content, re.IGNORECASE | re.MULTILINE):
-                passed_checks += 1
-
+        passed_checks = sum(1 for pattern, description in checks if pattern.search(content_lower))
         return passed_checks / len(checks)
 
     def _generate_recommendations(self, metrics: Dict[str, float], content_type: str) -> list:
@@ -374,14 +544,7 @@ class QualityAgent(BaseAgent):
 
     def _calculate_overall_score(self, metrics: Dict[str, float]) -> float:
         """Calculate weighted overall quality score"""
-        weights = {
-            "accuracy": 0.25,
-            "completeness": 0.20,
-            "readability": 0.15,
-            "engagement": 0.15,
-            "structure": 0.15,
-            "factual_consistency": 0.10
-        }
+        weights = _OVERALL_WEIGHTS
 
         # Normalize readability to 0-1 scale
         normalized_readability = max(0, min(1, metrics["readability"] / 100))
@@ -403,8 +566,9 @@ class QualityAgent(BaseAgent):
         error_indicators = ["error", "wrong", "incorrect", "mistake", "bug"]
         positive_indicators = ["correct", "accurate", "precise", "verified"]
 
-        error_count = sum(content.lower().count(word) for word in error_indicators)
-        positive_count = sum(content.lower().count(word) for word in positive_indicators)
+        lowered = content.lower()
+        error_count = sum(lowered.count(word) for word in error_indicators)
+        positive_count = sum(lowered.count(word) for word in positive_indicators)
 
         # Basic scoring
         if error_count > positive_count:
@@ -1,8 +1,42 @@
-from configuration.configuration import Configuration as Config
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, TypeVar
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+
+from google.genai import errors, types
+
+from configuration.configuration import Configuration as Config, logger
 from services.memory import AgentMemory
 
+T = TypeVar("T")
+
+# Gemini status codes worth retrying: rate limited or temporarily overloaded
+_RETRYABLE_STATUS_CODES = {429, 503}
+
+# Batch job states after which polling stops, and those whose per-request responses can be read
+_BATCH_TERMINAL_STATES = {
+    "JOB_STATE_SUCCEEDED", "JOB_STATE_PARTIALLY_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED",
+    "JOB_STATE_EXPIRED"
+}
+_BATCH_USABLE_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_PARTIALLY_SUCCEEDED"}
+
+
+def _retry_after(error: errors.APIError) -> Optional[float]:
+    """Seconds the server asked us to wait, if it sent a numeric Retry-After header"""
+    headers = getattr(error.response, "headers", None)
+    try:
+        return float(headers["Retry-After"]) if headers and "Retry-After" in headers else None
+    except ValueError:
+        return None
+
 
 class BaseAgent:
+    BATCH_POLL_INTERVAL_S = 30
+
+    # Shared by all agents so concurrent model calls stay under the rate limit
+    _call_slots: Optional[asyncio.Semaphore] = None
+
     def __init__(self, name: str, config: Config, memory: AgentMemory):
         self.name = name
         self.config = config
@@ -10,4 +44,100 @@ class BaseAgent:
         self.status = "idle"
 
     def update_status(self, status: str):
-        self.status = status
\ No newline at end of file
+        self.status = status
+
+    def _model_call_slots(self) -> asyncio.Semaphore:
+        if BaseAgent._call_slots is None:
+            BaseAgent._call_slots = asyncio.Semaphore(self.config.gemini_max_concurrency)
+        return BaseAgent._call_slots
+
+    async def _call_with_timeout(self, make_call: Callable[[], Awaitable[T]], timeout: Optional[float] = None,
+                                 retries: Optional[int] = None, rate_limit_retries: Optional[int] = None) -> T:
+        """
+        Await a model call with a timeout, retrying with backoff when it times out or is rate limited.
+        make_call must return a cancellable coroutine (the aio client), not a thread: a timed-out thread keeps
+        running after its call slot is released, so in-flight calls would exceed GEMINI_MAX_CONCURRENCY.
+        """
+        timeout = timeout or self.config.gemini_timeout_s
+        if retries is None:
+            retries = self.config.gemini_max_retries
+        if rate_limit_retries is None:
+            rate_limit_retries = self.config.gemini_rate_limit_retries
+
+        for attempt in range(max(retries, rate_limit_retries) + 1):
+            try:
+                async with self._model_call_slots():
+                    return await asyncio.wait_for(make_call(), timeout=timeout)
+            except asyncio.TimeoutError:
+                if attempt >= retries:
+                    raise
+                logger.warning(f"⚠️ {self.name} model call timed out after {timeout}s, retrying ({attempt + 1}/{retries})")
+                delay = 0.5 * 2 ** attempt
+            except errors.APIError as e:
+                if e.code not in _RETRYABLE_STATUS_CODES or attempt >= rate_limit_retries:
+                    raise
+                delay = _retry_after(e) or min(30.0, 2 ** attempt + random.uniform(0, 1))
+                logger.warning(f"⚠️ {self.name} model call rejected ({e.code}), retrying in {delay:.1f}s "
+                               f"({attempt + 1}/{rate_limit_retries})")
+
+            await asyncio.sleep(delay)
+
+    async def _stream_with_timeout(self, open_stream: Callable[[], Awaitable[AsyncIterator[T]]],
+                                   timeout: Optional[float] = None) -> AsyncIterator[T]:
+        """Open a model stream with the usual retries, then hold a call slot while reading it, timing out each chunk"""
+        timeout = timeout or self.config.gemini_timeout_s
+        stream = await self._call_with_timeout(open_stream, timeout)
+
+        async with self._model_call_slots():
+            chunks = stream.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+                except StopAsyncIteration:
+                    return
+                yield chunk
+
+    async def _run_batch_job(self, prompts: List[str],
+                             config: Optional[types.GenerateContentConfig] = None) -> List[Optional[str]]:
+        """
+        Submit prompts as one inline Gemini batch job and wait for it, returning response text per prompt.
+        Failed requests come back as None; a job still running after gemini_batch_max_wait_s is cancelled.
+        """
+        request_config = {"config": config} if config else {}
+        job = await self.gemini_client.aio.batches.create(
+            model="gemini-1.5-flash",
+            src=[
+                {"contents": [{"role": "user", "parts": [{"text": prompt}]}], **request_config}
+                for prompt in prompts
+            ],
+            config={"display_name": f"{self.name}-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}"},
+        )
+        logger.info(f"📤 {self.name} submitted batch job {job.name} ({len(prompts)} requests)")
+
+        deadline = time.monotonic() + self.config.gemini_batch_max_wait_s
+        while job.state.name not in _BATCH_TERMINAL_STATES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                await self._cancel_batch_job(job.name)
+                raise TimeoutError(f"Batch job {job.name} still {job.state.name} after "
+                                   f"{self.config.gemini_batch_max_wait_s}s, cancelled")
+            await asyncio.sleep(min(self.BATCH_POLL_INTERVAL_S, remaining))
+            job = await self.gemini_client.aio.batches.get(name=job.name)
+
+        if job.state.name not in _BATCH_USABLE_STATES:
+            raise RuntimeError(f"Batch job {job.name} ended in {job.state.name}")
+
+        responses = []
+        for inlined in job.dest.inlined_responses:
+            if inlined.error or not inlined.response:
+                responses.append(None)
+            else:
+                responses.append(inlined.response.text)
+        return responses
+
+    async def _cancel_batch_job(self, name: str) -> None:
+        try:
+            await self.gemini_client.aio.batches.cancel(name=name)
+            logger.warning(f"⚠️ {self.name} cancelled batch job {name}")
+        except Exception as e:
+            logger.error(f"❌ {self.name} could not cancel batch job {name}: {e}")
@@ -1,5 +1,5 @@
-from typing import Dict, Any, List
-from configuration.configuration import Configuration as Config, logger
+from typing import AsyncIterator, Dict, Any, List
+from configuration.configuration import get_config, logger
 from services.workflow_orchestrator import WorkflowOrchestrator
 
 
@@ -10,7 +10,7 @@ class ContentGeneratorService:
     """
 
     def __init__(self):
-        self.config = Config()
+        self.config = get_config()
 
         # Validate configuration
         if not self.config.validate():
@@ -144,6 +144,31 @@ class ContentGeneratorService:
             constraints=constraints
         )
 
+    async def stream_from_multiple_sources(
+            self,
+            sources: List[Dict[str, Any]],
+            topic: str,
+            content_type: str,
+            audience_level: str = "intermediate",
+            tone: str = "conversational",
+            constraints: Dict[str, Any] = None
+    ) -> AsyncIterator[str]:
+        """Stream content generated from multiple knowledge sources"""
+        if not sources or not topic:
+            raise ValueError("Sources and topic are required")
+
+        logger.info(f"🔗 Streaming {content_type} from {len(sources)} sources")
+
+        async for text in self.orchestrator.stream_content_pipeline(
+                topic=topic,
+                content_type=content_type,
+                sources=sources,
+                audience_level=audience_level,
+                tone=tone,
+                constraints=constraints
+        ):
+            yield text
+
     async def get_task_status(self, task_id: str) -> Dict[str, Any]:
         """Get the status of a content generation task"""
         return await self.orchestrator.get_task_status(task_id)
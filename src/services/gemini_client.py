@@ -0,0 +1,9 @@
+from functools import lru_cache
+
+from google import genai
+
+
+@lru_cache(maxsize=None)
+def get_gemini_client(api_key: str) -> genai.Client:
+    """Share one Gemini client (and its connection pool) per API key across the process"""
+    return genai.Client(api_key=api_key)
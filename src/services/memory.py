@@ -1,10 +1,14 @@
-from typing import Dict, List, Optional
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from sentence_transformers import SentenceTransformer
-import google.genai as genai
+from mongoengine.errors import NotUniqueError
+from pymongo import UpdateOne
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 
-from models.models import SourceDocument, ContentChunk, Concept, Relationship
+from models.models import SourceDocument, ContentChunk, Concept, Relationship, bulk_save
+from services.gemini_client import get_gemini_client
 from configuration.configuration import Configuration as Config, logger
 
 
@@ -17,7 +21,11 @@ def store_relationship(concept1: str, concept2: str, relation_type: str = "relat
             concept2_id=c2.id,
             relation_type=relation_type,
         )
-        rel.save()
+        try:
+            rel.save()
+        except NotUniqueError:
+            logger.debug(f"Relationship already stored: {concept1} -> {concept2} ({relation_type})")
+            return
         logger.info(f"Stored relationship: {concept1} -> {concept2} ({relation_type})")
 
 
@@ -30,10 +38,23 @@ class AgentMemory:
         self.config = config
         self.embedding_model = SentenceTransformer(config.embedding_model)
 
+        # Repeated search queries (topics, expansions) reuse their embedding
+        self._embed_query_cached = lru_cache(maxsize=1024)(self._encode_to_bytes)
+
+        # Fetched source files by URL -> (etag, content), revalidated with If-None-Match
+        self.http_cache: Dict[str, Tuple[str, str]] = {}
+
+        # Concept and relationship writes are buffered and flushed together once this many are pending
+        self.flush_every = 100
+        self._pending_concepts: List[Concept] = []
+        self._pending_relationships: List[UpdateOne] = []
+        # The queues are filled on the event loop thread but may be flushed from request threads
+        self._pending_lock = threading.Lock()
+
         if not self.config.gemini_api_key:
             raise ValueError("❌ Missing GEMINI_API_KEY. Please set it in your .env")
 
-        self.gemini_client = genai.Client(api_key=self.config.gemini_api_key)
+        self.gemini_client = get_gemini_client(self.config.gemini_api_key)
         logger.info("✅ Gemini client initialized")
 
         # Initialize memory statistics
@@ -70,14 +91,13 @@ class AgentMemory:
             chunk_content = content[start:end]
 
             # Generate embeddings for semantic search
-            embedding = self.embedding_model.encode(chunk_content, show_progress_bar=False).tolist()
+            embedding = self.embedding_model.encode(chunk_content, show_progress_bar=False)
 
             chunk = ContentChunk(
                 id=f"{document.id}_chunk_{chunk_index}",
-                document=document,
+                document_id=str(document.id),
                 content=chunk_content,
                 chunk_index=chunk_index,
-                embedding=embedding,
                 metadata={
                     "document_title": document.title,
                     "document_type": document.doc_type,
@@ -88,48 +108,133 @@ class AgentMemory:
                     "end_position": end
                 },
             )
+            chunk.set_embedding(embedding)
             chunks.append(chunk)
             start = end - self.config.chunk_overlap
             chunk_index += 1
 
-        for chunk in chunks:
-            chunk.save()
+        bulk_save(chunks)
 
         self.stats["chunks_created"] += len(chunks)
         logger.info(f"Created {len(chunks)} chunks for document {document.id}")
 
     def check_duplicate(self, document: SourceDocument) -> bool:
-        """Check for duplicate content using semantic similarity"""
-        query_embedding = self.embedding_model.encode(document.content, show_progress_bar=False).tolist()
+        """Check for duplicate content by document ID, then by semantic similarity"""
+        # Text documents are keyed by a content hash, so a stored ID means identical content;
+        # URL-keyed website and GitHub documents may have changed and go through the similarity check
+        if document.source == "text" and SourceDocument.objects(id=document.id).only("id").first():
+            logger.info(f"Duplicate detected for document {document.id} (already stored)")
+            return True
+
+        query_embedding = self.embedding_model.encode(document.content, show_progress_bar=False)
 
         # Check against existing chunks for similarity
-        existing_chunks = ContentChunk.objects().limit(100)  # Sample for performance
-        for chunk in existing_chunks:
-            if chunk.embedding:
-                similarity = cosine_similarity(
-                    [query_embedding],
-                    [chunk.embedding]
-                )[0][0]
-                if similarity > 0.95:  # High similarity threshold
-                    logger.info(f"Duplicate detected for document {document.id} (similarity: {similarity:.3f})")
-                    return True
+        existing_chunks = [chunk for chunk in ContentChunk.objects().limit(100) if chunk.embedding]  # Sample for performance
+        if not existing_chunks:
+            return False
+
+        similarities = cosine_similarity([query_embedding], [chunk.get_embedding() for chunk in existing_chunks])[0]
+        similarity = similarities.max()
+        if similarity > 0.95:  # High similarity threshold
+            logger.info(f"Duplicate detected for document {document.id} (similarity: {similarity:.3f})")
+            return True
         return False
 
     def store_concept(self, concept: str, document_id: str) -> str:
         """Store concept with embedding for semantic relationships"""
-        embedding = self.embedding_model.encode(concept, show_progress_bar=False).tolist()
+        embedding = self.embedding_model.encode(concept, show_progress_bar=False)
         concept_obj = Concept(
             name=concept,
             document_id=document_id,
-            embedding=embedding,
         )
+        concept_obj.set_embedding(embedding)
         concept_obj.save()
         self.stats["concepts_extracted"] += 1
         logger.debug(f"Stored concept: {concept} for document {document_id}")
         return concept_obj.id
 
+    def store_concepts_bulk(self, concepts: List[str], document_id: str) -> Dict[str, str]:
+        """Store concepts with one batched embedding pass and one bulk write, returning name -> id"""
+        if not concepts:
+            return {}
+
+        embeddings = self.embedding_model.encode(concepts, show_progress_bar=False)
+        concept_objs = []
+        for concept, embedding in zip(concepts, embeddings):
+            concept_obj = Concept(name=concept, document_id=document_id)
+            concept_obj.set_embedding(embedding)
+            concept_objs.append(concept_obj)
+
+        with self._pending_lock:
+            self._pending_concepts.extend(concept_objs)
+        self._flush_if_full()
+        logger.debug(f"Queued {len(concept_objs)} concepts for document {document_id}")
+        return {concept_obj.name: concept_obj.id for concept_obj in concept_objs}
+
+    def store_relationships_bulk(self, relationships: List[Tuple[str, str, str]], concept_ids: Dict[str, str]) -> int:
+        """Queue (concept1, concept2, relation_type) triples as upserts that skip existing ones"""
+        operations = []
+        for concept1, concept2, relation_type in relationships:
+            if concept1 in concept_ids and concept2 in concept_ids:
+                rel = Relationship(
+                    concept1_id=concept_ids[concept1],
+                    concept2_id=concept_ids[concept2],
+                    relation_type=relation_type,
+                )
+                key = {"concept1_id": rel.concept1_id, "concept2_id": rel.concept2_id, "relation_type": relation_type}
+                operations.append(UpdateOne(key, {"$setOnInsert": rel.to_mongo().to_dict()}, upsert=True))
+
+        with self._pending_lock:
+            self._pending_relationships.extend(operations)
+        self._flush_if_full()
+        return len(operations)
+
+    def _flush_if_full(self) -> None:
+        if len(self._pending_concepts) + len(self._pending_relationships) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered concepts, then relationships, each in one bulk write; a failed batch stays queued"""
+        with self._pending_lock:
+            concepts, self._pending_concepts = self._pending_concepts, []
+            operations, self._pending_relationships = self._pending_relationships, []
+        if not concepts and not operations:
+            return
+
+        try:
+            if concepts:
+                bulk_save(concepts)
+                self.stats["concepts_extracted"] += len(concepts)
+                concepts_written, concepts = len(concepts), []
+            else:
+                concepts_written = 0
+            if operations:
+                result = Relationship._get_collection().bulk_write(operations, ordered=False)
+                self.stats["relationships_mapped"] += result.upserted_count
+        except Exception:
+            # Both writes are idempotent upserts, so the next flush can safely retry whatever is put back
+            with self._pending_lock:
+                self._pending_concepts[:0] = concepts
+                self._pending_relationships[:0] = operations
+            logger.error(f"❌ Flush failed, keeping {len(concepts)} concepts and {len(operations)} relationships queued")
+            raise
+
+        logger.info(f"Flushed {concepts_written} concepts and {len(operations)} relationships")
+
+    def _encode_to_bytes(self, text: str) -> bytes:
+        return self.embedding_model.encode(text, show_progress_bar=False).astype(np.float32).tobytes()
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed a search query, caching the float32 vector by text"""
+        return np.frombuffer(self._embed_query_cached(text), dtype=np.float32)
+
     def search_relevant_content(self, query: str, n_results: int = 10, min_score: float = 0.3) -> List[Dict]:
         """Advanced semantic search with query expansion and relationship scoring"""
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning(f"⚠️ Flush before search failed, searching stored content only: {e}")
+
         try:
             # Query expansion using Gemini
             exp_response = self.gemini_client.models.generate_content(
@@ -145,31 +250,33 @@ class AgentMemory:
 
         all_results = []
 
+        # Get all chunks once and calculate similarity manually for better control
+        chunks = [chunk for chunk in ContentChunk.objects().limit(200) if chunk.embedding]  # Reasonable limit for performance
+        chunk_embeddings = np.stack([chunk.get_embedding() for chunk in chunks]) if chunks else None
+
         # Search with each expanded query
         for exp_query in expanded_queries:
-            query_embedding = self.embedding_model.encode(exp_query, show_progress_bar=False).tolist()
-
-            # Get all chunks and calculate similarity manually for better control
-            chunks = ContentChunk.objects().limit(200)  # Reasonable limit for performance
-
-            for chunk in chunks:
-                if chunk.embedding:
-                    similarity = cosine_similarity([query_embedding], [chunk.embedding])[0][0]
-
-                    if similarity >= min_score:
-                        # Calculate relationship bonus
-                        relationship_bonus = self._calculate_relationship_bonus(chunk.metadata.get('document_id'))
-
-                        result = {
-                            'content': chunk.content,
-                            'metadata': chunk.metadata,
-                            'id': chunk.id,
-                            'similarity': similarity,
-                            'relationship_bonus': relationship_bonus,
-                            'score': similarity + relationship_bonus,
-                            'query_used': exp_query
-                        }
-                        all_results.append(result)
+            if chunk_embeddings is None:
+                break
+
+            query_embedding = self.embed_query(exp_query)
+            similarities = cosine_similarity([query_embedding], chunk_embeddings)[0]
+
+            for chunk, similarity in zip(chunks, similarities):
+                if similarity >= min_score:
+                    # Calculate relationship bonus
+                    relationship_bonus = self._calculate_relationship_bonus(chunk.metadata.get('document_id'))
+
+                    result = {
+                        'content': chunk.content,
+                        'metadata': chunk.metadata,
+                        'id': chunk.id,
+                        'similarity': similarity,
+                        'relationship_bonus': relationship_bonus,
+                        'score': similarity + relationship_bonus,
+                        'query_used': exp_query
+                    }
+                    all_results.append(result)
 
         # Remove duplicates and sort by score
         seen_chunks = set()
@@ -200,7 +307,7 @@ class AgentMemory:
         return min(relationship_count * 0.02, 0.2)
 
     def get_memory_stats(self) -> Dict:
-        """Get memory system statistics"""
+        """Get memory system statistics; buffered writes are not flushed, so counts may trail the queue"""
         return {
             **self.stats,
             "total_documents": SourceDocument.objects.count(),
@@ -211,6 +318,7 @@ class AgentMemory:
 
     def build_knowledge_graph(self, document_id: str) -> Dict:
         """Build knowledge graph for a specific document"""
+        self.flush()
         concepts = Concept.objects(document_id=document_id)
         relationships = []
 
@@ -0,0 +1,117 @@
+import hashlib
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import orjson
+
+
+def cache_scope(*fields) -> str:
+    """Digest of the request fields a cached response must match exactly"""
+    payload = orjson.dumps(fields, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.md5(payload, usedforsecurity=False).hexdigest()
+
+
+class SemanticCache:
+    """
+    In-process cache of LLM responses keyed by a short text within a scope.
+    Exact texts are matched by hash; otherwise the most similar cached text in the same scope
+    is returned when its cosine similarity reaches the threshold. The scope holds the fields
+    that must match exactly, so only the text that varies (e.g. a topic) is embedded.
+    """
+
+    def __init__(self, embed: Callable[[str], np.ndarray], threshold: float = 0.95,
+                 ttl_seconds: float = 86400, max_entries: int = 1024):
+        self.embed = embed
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._exact: Dict[str, Tuple[float, str]] = {}
+        self._keys: List[str] = []
+        self._scopes: List[str] = []
+        self._values: List[str] = []
+        self._timestamps: List[float] = []
+        self._vectors: Optional[np.ndarray] = None  # unit-normalized rows quantized to int8
+        self._scales: Optional[np.ndarray] = None  # float32 per-row dequantization scales
+
+        self.stats = {"hits": 0, "semantic_hits": 0, "misses": 0}
+
+    def get(self, text: str, scope: str = "") -> Optional[str]:
+        """Return a cached response for this or a near-identical text in the same scope"""
+        now = time.time()
+        key = self._key(text, scope)
+
+        entry = self._exact.get(key)
+        if entry and now - entry[0] < self.ttl_seconds:
+            self.stats["hits"] += 1
+            return entry[1]
+
+        # Only live entries of the same scope are candidates for a semantic hit
+        candidates = np.fromiter(
+            (entry_scope == scope and now - ts < self.ttl_seconds
+             for entry_scope, ts in zip(self._scopes, self._timestamps)),
+            dtype=bool, count=len(self._scopes)
+        )
+        if candidates.any():
+            similarities = (self._vectors @ self._normalize(self.embed(text))) * self._scales
+            similarities[~candidates] = -np.inf
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.threshold:
+                self.stats["hits"] += 1
+                self.stats["semantic_hits"] += 1
+                return self._values[best]
+
+        self.stats["misses"] += 1
+        return None
+
+    def set(self, text: str, response: str, scope: str = "") -> None:
+        """Cache a response, evicting expired and then oldest entries"""
+        now = time.time()
+        key = self._key(text, scope)
+        vector, scale = self._quantize(self._normalize(self.embed(text)))
+
+        self._exact[key] = (now, response)
+        self._keys.append(key)
+        self._scopes.append(scope)
+        self._values.append(response)
+        self._timestamps.append(now)
+        if self._vectors is None:
+            self._vectors, self._scales = vector, scale
+        else:
+            self._vectors = np.vstack([self._vectors, vector])
+            self._scales = np.concatenate([self._scales, scale])
+
+        keep = [i for i, ts in enumerate(self._timestamps) if now - ts < self.ttl_seconds][-self.max_entries:]
+        if len(keep) < len(self._keys):
+            self._evict(keep)
+
+    def _evict(self, keep: List[int]) -> None:
+        kept_keys = {self._keys[i] for i in keep}
+        for key in self._keys:
+            if key not in kept_keys:
+                self._exact.pop(key, None)
+
+        self._keys = [self._keys[i] for i in keep]
+        self._scopes = [self._scopes[i] for i in keep]
+        self._values = [self._values[i] for i in keep]
+        self._timestamps = [self._timestamps[i] for i in keep]
+        self._vectors = self._vectors[keep] if keep else None
+        self._scales = self._scales[keep] if keep else None
+
+    @staticmethod
+    def _key(text: str, scope: str) -> str:
+        return hashlib.md5(f"{scope}\0{text}".encode("utf-8", "ignore"), usedforsecurity=False).hexdigest()
+
+    @staticmethod
+    def _quantize(vector: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Symmetric int8 quantization of one vector, as a (1, D) row and its (1,) scale"""
+        scale = np.float32(np.max(np.abs(vector)) / 127.0) or np.float32(1.0)
+        row = np.round(vector / scale).astype(np.int8)[np.newaxis, :]
+        return row, np.array([scale], dtype=np.float32)
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -2,7 +2,7 @@ import asyncio
 import logging
 from pathlib import Path
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 from configuration.configuration import Configuration as Config
 from services.memory import AgentMemory
@@ -144,17 +144,34 @@ class WorkflowOrchestrator:
             return {"status": "error", "message": f"Pipeline execution failed: {str(e)}"}
 
     async def _execute_ingestion_phase(self, task: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Execute knowledge ingestion for all sources"""
-        ingestion_results: List[Dict[str, Any]] = []
+        """Execute knowledge ingestion for all sources concurrently"""
         sources = task.get("sources", [])
 
         if not sources:
             logger.warning("⚠️ No sources provided for ingestion")
             return []
 
-        # Process each source
-        for i, source in enumerate(sources):
-            logger.info(f"📥 Processing source {i + 1}/{len(sources)}: {source.get('type', 'unknown')}")
+        # Process sources concurrently, bounded by the configured agent concurrency
+        semaphore = asyncio.Semaphore(max(1, getattr(self.config, "max_concurrent_agents", 2)))
+        results = await asyncio.gather(*[
+            self._ingest_source(i, len(sources), source, semaphore)
+            for i, source in enumerate(sources)
+        ])
+        ingestion_results: List[Dict[str, Any]] = [result for result in results if result]
+
+        logger.info(f"📥 Ingestion complete: {len(ingestion_results)}/{len(sources)} sources successful")
+        return ingestion_results
+
+    async def _ingest_source(
+            self,
+            i: int,
+            total: int,
+            source: Dict[str, Any],
+            semaphore: asyncio.Semaphore
+    ) -> Optional[Dict[str, Any]]:
+        """Ingest a single source, returning the result only on success"""
+        async with semaphore:
+            logger.info(f"📥 Processing source {i + 1}/{total}: {source.get('type', 'unknown')}")
 
             ingestion_task = {
                 "type": source.get("type"),
@@ -167,16 +184,15 @@ class WorkflowOrchestrator:
                 result = await self.ingestion_agent.process(ingestion_task)
 
                 if result and result.get("status") == "success":
-                    ingestion_results.append(result)
                     logger.info(f"✅ Source {i + 1} ingested successfully")
-                else:
-                    logger.warning(f"⚠️ Source {i + 1} ingestion failed: {result.get('message', 'Unknown error') if result else 'No result'}")
+                    return result
+
+                logger.warning(f"⚠️ Source {i + 1} ingestion failed: {result.get('message', 'Unknown error') if result else 'No result'}")
 
             except Exception as e:
                 logger.exception(f"❌ Source {i + 1} ingestion error: {e}")
 
-        logger.info(f"📥 Ingestion complete: {len(ingestion_results)}/{len(sources)} sources successful")
-        return ingestion_results
+            return None
 
     async def _execute_planning_phase(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """Execute content planning phase"""
@@ -487,22 +503,8 @@ class WorkflowOrchestrator:
         if not sources:
             return {"error": "At least one knowledge source is required"}
 
-        # Generate unique task ID
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        safe_topic = topic.replace(' ', '_')
-        content_id = f"{content_type}_{safe_topic}_{timestamp}"
-
-        # Create comprehensive task
-        task = {
-            "id": content_id,
-            "topic": topic,
-            "content_type": content_type,
-            "audience_level": audience_level,
-            "tone": tone,
-            "constraints": constraints or {},
-            "sources": sources,
-            "created_at": datetime.now().isoformat()
-        }
+        task = self._create_task(topic, content_type, sources, audience_level, tone, constraints)
+        content_id = task["id"]
 
         logger.info(f"🎯 New content generation request: {content_id}")
         logger.info(f"   Topic: {topic}")
@@ -533,6 +535,77 @@ class WorkflowOrchestrator:
             ]
         }
 
+    async def stream_content_pipeline(
+            self,
+            topic: str,
+            content_type: str,
+            sources: List[Dict[str, Any]],
+            audience_level: str = "intermediate",
+            tone: str = "conversational",
+            constraints: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Run ingestion and planning, then stream a single generation pass.
+        The quality loop is skipped because content is delivered as it is produced.
+        """
+        if not topic or not content_type:
+            raise ValueError("Topic and content_type are required")
+
+        if not sources:
+            raise ValueError("At least one knowledge source is required")
+
+        task = self._create_task(topic, content_type, sources, audience_level, tone, constraints)
+        logger.info(f"🎯 New streamed content generation request: {task['id']}")
+
+        ingestion_results = await self._execute_ingestion_phase(task)
+        if not ingestion_results:
+            raise ValueError("No content successfully ingested")
+
+        planning_result = await self._execute_planning_phase(task)
+        if planning_result.get("status") != "success":
+            raise ValueError("Planning phase failed")
+
+        generation_task = {
+            "topic": topic,
+            "content_type": content_type,
+            "audience_level": audience_level,
+            "tone": tone,
+            "constraints": task["constraints"],
+            "plan": planning_result,
+            "sources": ingestion_results,
+            "recommendations": []
+        }
+
+        async for text in self.generation_agent.stream(generation_task):
+            yield text
+
+    def _create_task(
+            self,
+            topic: str,
+            content_type: str,
+            sources: List[Dict[str, Any]],
+            audience_level: str,
+            tone: str,
+            constraints: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Build a pipeline task with a unique ID"""
+        # Generate unique task ID
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        safe_topic = topic.replace(' ', '_')
+        content_id = f"{content_type}_{safe_topic}_{timestamp}"
+
+        # Create comprehensive task
+        return {
+            "id": content_id,
+            "topic": topic,
+            "content_type": content_type,
+            "audience_level": audience_level,
+            "tone": tone,
+            "constraints": constraints or {},
+            "sources": sources,
+            "created_at": datetime.now().isoformat()
+        }
+
     async def get_task_status(self, task_id: str) -> Dict[str, Any]:
         """Get status of a specific task (placeholder)"""
         # TODO: replace with DB/cache-backed status tracking
@@ -572,6 +645,9 @@ class WorkflowOrchestrator:
 
     async def shutdown(self):
         """Gracefully shutdown the orchestrator"""
+        await self.ingestion_agent.close()
+        self.memory.flush()
+
         if not self.is_running:
             logger.info("🛑 Orchestrator is not running")
             return
@@ -0,0 +1,98 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from configuration.configuration import Configuration
+from services.base_agent import BaseAgent
+
+
+def _job(state: str, responses=()):
+    return SimpleNamespace(
+        name="batches/test",
+        state=SimpleNamespace(name=state),
+        dest=SimpleNamespace(inlined_responses=list(responses)),
+    )
+
+
+def _inlined(text=None, error=None):
+    return SimpleNamespace(error=error, response=SimpleNamespace(text=text) if text is not None else None)
+
+
+class _BatchAgent(BaseAgent):
+    BATCH_POLL_INTERVAL_S = 0
+
+    def __init__(self, batches, **config):
+        super().__init__("TestAgent", Configuration(**config), memory=None)
+        self.gemini_client = SimpleNamespace(aio=SimpleNamespace(batches=batches))
+
+
+def _batches(*polled_jobs):
+    return SimpleNamespace(
+        create=AsyncMock(return_value=_job("JOB_STATE_PENDING")),
+        get=AsyncMock(side_effect=list(polled_jobs)),
+        cancel=AsyncMock(),
+    )
+
+
+def test_partially_succeeded_job_returns_usable_responses():
+    batches = _batches(
+        _job("JOB_STATE_RUNNING"),
+        _job("JOB_STATE_PARTIALLY_SUCCEEDED", [_inlined("first"), _inlined(error="quota"), _inlined("third")]),
+    )
+    agent = _BatchAgent(batches)
+
+    responses = asyncio.run(agent._run_batch_job(["a", "b", "c"]))
+
+    assert responses == ["first", None, "third"]
+    assert batches.get.await_count == 2
+    batches.cancel.assert_not_awaited()
+
+
+def test_failed_job_raises():
+    agent = _BatchAgent(_batches(_job("JOB_STATE_FAILED")))
+
+    with pytest.raises(RuntimeError, match="JOB_STATE_FAILED"):
+        asyncio.run(agent._run_batch_job(["a"]))
+
+
+def test_job_past_deadline_is_cancelled():
+    batches = _batches()
+    agent = _BatchAgent(batches, gemini_batch_max_wait_s=0)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(agent._run_batch_job(["a"]))
+
+    batches.cancel.assert_awaited_once_with(name="batches/test")
+
+
+async def _chunks(*delays):
+    for i, delay in enumerate(delays):
+        await asyncio.sleep(delay)
+        yield i
+
+
+def _collect(agent, stream_factory, timeout):
+    async def collect():
+        return [chunk async for chunk in agent._stream_with_timeout(stream_factory, timeout)]
+    return asyncio.run(collect())
+
+
+def test_stream_with_timeout_yields_every_chunk():
+    agent = _BatchAgent(_batches())
+
+    async def open_stream():
+        return _chunks(0, 0, 0)
+
+    assert _collect(agent, open_stream, timeout=1) == [0, 1, 2]
+
+
+def test_stream_with_timeout_bounds_each_chunk():
+    agent = _BatchAgent(_batches())
+
+    async def open_stream():
+        return _chunks(0, 5)
+
+    with pytest.raises(asyncio.TimeoutError):
+        _collect(agent, open_stream, timeout=0.05)
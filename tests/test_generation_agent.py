@@ -0,0 +1,77 @@
+import random
+
+import numpy as np
+
+from services.agents.generation_agent import GenerationAgent
+from services.agents.planning_agent import PlanningAgent, PlanningTask
+from services.semantic_cache import SemanticCache
+
+
+def _chunk(i: int, score: float, tokens: int) -> dict:
+    return {"content": f"chunk {i}", "score": score, "_tok": tokens, "metadata": {"document_title": f"doc {i}"}}
+
+
+def _selected_titles(context: str) -> list:
+    return [part.split("\n", 1)[0] for part in context.split("\n\n---\n\n")] if context else []
+
+
+def _reference_selection(chunks: list, max_tokens: int) -> list:
+    """Selection as the original loop made it: best score first, stopping at the first chunk that does not fit"""
+    selected, total = [], 0
+    for chunk in sorted(chunks, key=lambda c: c["score"], reverse=True):
+        if total + chunk["_tok"] > max_tokens:
+            break
+        selected.append(f"Source: {chunk['metadata']['document_title']}")
+        total += chunk["_tok"]
+    return selected
+
+
+def test_optimize_context_takes_best_chunks_within_budget():
+    agent = GenerationAgent.__new__(GenerationAgent)
+    chunks = [_chunk(0, 0.5, 40), _chunk(1, 0.9, 50), _chunk(2, 0.7, 30), _chunk(3, 0.8, 100)]
+
+    context = agent._optimize_context(chunks, max_tokens=100)
+
+    assert _selected_titles(context) == ["Source: doc 1"]
+    assert agent._optimize_context([], max_tokens=100) == ""
+
+
+def test_optimize_context_matches_reference_selection():
+    agent = GenerationAgent.__new__(GenerationAgent)
+    rng = random.Random(0)
+    for _ in range(500):
+        chunks = [_chunk(i, rng.choice([0.2, 0.5, rng.random()]), rng.randint(0, 400)) for i in range(rng.randint(1, 12))]
+        max_tokens = rng.randint(0, 2000)
+
+        context = agent._optimize_context(chunks, max_tokens)
+
+        assert _selected_titles(context) == _reference_selection(chunks, max_tokens)
+
+
+def test_response_cache_key_keeps_settings_out_of_the_embedding():
+    task = {"topic": "Python decorators", "content_type": "tutorial", "audience_level": "beginner",
+            "constraints": {"word_count": 500}, "plan": {"outline": ["Intro"]}}
+
+    topic, scope = GenerationAgent._response_cache_key(task)
+
+    assert topic == "Python decorators"
+    assert scope != GenerationAgent._response_cache_key({**task, "audience_level": "expert"})[1]
+    assert scope != GenerationAgent._response_cache_key({**task, "constraints": {"word_count": 3000}})[1]
+    assert scope == GenerationAgent._response_cache_key({**task, "topic": "Rust lifetimes"})[1]
+
+
+def test_response_cache_hits_across_plans_built_for_the_same_task():
+    planner = PlanningAgent.__new__(PlanningAgent)
+    plan_task = PlanningTask(topic="Python decorators", content_type="tutorial", audience_level="beginner")
+    response = '{"outline": ["Intro", "Syntax"], "objectives": ["Write a decorator"], "key_concepts": ["closure"]}'
+    first_plan = planner._build_plan_result(plan_task, response, context_sources=3, cache_hit=False)
+    second_plan = planner._build_plan_result(plan_task, response, context_sources=5, cache_hit=True)
+    assert first_plan["planning_metadata"] != second_plan["planning_metadata"]
+
+    task = {"topic": "Python decorators", "content_type": "tutorial", "audience_level": "beginner"}
+    cache = SemanticCache(lambda text: np.ones(4), threshold=0.95)
+    topic, scope = GenerationAgent._response_cache_key({**task, "plan": first_plan})
+    cache.set(topic, "content", scope)
+
+    topic, scope = GenerationAgent._response_cache_key({**task, "plan": second_plan})
+    assert cache.get(topic, scope) == "content"
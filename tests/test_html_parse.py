@@ -0,0 +1,29 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from services.agents.html_parse import _parse_page, _parse_page_soup
+
+
+_PAGE = b"""<html><head><style>p {}</style></head><body>
+<nav><a href="/nav">Menu</a></nav>
+<p>Hello <a href="guide.html#intro">guide</a></p>
+<a href="mailto:someone@example.com">mail</a>
+<script>var x = 1;</script>
+</body></html>"""
+
+
+def test_parse_page_strips_chrome_and_resolves_links():
+    text, links = _parse_page(_PAGE, "https://example.com/docs/")
+
+    soup_text, soup_links = _parse_page_soup(_PAGE, "https://example.com/docs/")
+
+    # Whitespace differs between the parsers and is normalized downstream
+    assert text.split() == soup_text.split() == ["Hello", "guide", "mail"]
+    assert links == soup_links == ["https://example.com/nav", "https://example.com/docs/guide.html"]
+
+
+def test_parser_module_does_not_import_the_agent_stack():
+    src = Path(__file__).resolve().parent.parent / "src"
+    check = "import sys, services.agents.html_parse; sys.exit(bool({'services.memory', 'google.genai'} & set(sys.modules)))"
+    assert subprocess.run([sys.executable, "-c", check], cwd=src).returncode == 0
@@ -0,0 +1,38 @@
+import random
+import re
+
+from services.agents.ingestion_agent import _GITHUB_PRIORITY_PATTERNS, IngestionAgent
+
+
+def _first_matching_pattern(name: str):
+    """Priority as the per-pattern search loop assigned it before the patterns were fused"""
+    for priority, pattern in enumerate(_GITHUB_PRIORITY_PATTERNS):
+        if re.search(pattern, name, re.IGNORECASE):
+            return priority
+    return None
+
+
+def _priorities(names):
+    contents = [{"type": "file", "name": name} for name in names]
+    return {item["name"]: priority for priority, item in IngestionAgent._match_github_files(contents)}
+
+
+def test_github_priority_follows_pattern_order():
+    priorities = _priorities(["README.md", "docs/guide.md", "api_reference.md", "setup.py", "Getting-Started.md"])
+
+    assert priorities == {"README.md": 0, "docs/guide.md": 3, "api_reference.md": 8, "Getting-Started.md": 7}
+
+
+def test_github_priority_matches_per_pattern_search():
+    rng = random.Random(0)
+    parts = ["readme", "README", "docs/", "doc/", "documentation/", "guide", "tutorial", "getting_started",
+             "api", "reference", "notes", "src/", ".md", ".rst", ".txt", ".py", "-", "x"]
+    names = ["".join(rng.choice(parts) for _ in range(rng.randint(1, 5))) for _ in range(5000)]
+
+    priorities = _priorities(names)
+    for name in set(names):
+        assert priorities.get(name) == _first_matching_pattern(name), name
+
+
+def test_directories_are_not_matched():
+    assert IngestionAgent._match_github_files([{"type": "dir", "name": "docs/readme.md"}]) == []
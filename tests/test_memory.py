@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+import services.memory as memory_module
+from services.memory import AgentMemory
+
+
+def _memory(concepts, relationships):
+    memory = AgentMemory.__new__(AgentMemory)
+    memory.stats = {"concepts_extracted": 0, "relationships_mapped": 0}
+    memory._pending_concepts = list(concepts)
+    memory._pending_relationships = list(relationships)
+    memory._pending_lock = threading.Lock()
+    return memory
+
+
+def test_failed_flush_keeps_the_batch_queued(monkeypatch):
+    def fail(documents):
+        raise RuntimeError("write failed")
+
+    monkeypatch.setattr(memory_module, "bulk_save", fail)
+    memory = _memory(["concept"], ["relationship"])
+
+    with pytest.raises(RuntimeError):
+        memory.flush()
+
+    assert memory._pending_concepts == ["concept"]
+    assert memory._pending_relationships == ["relationship"]
+    assert memory.stats["concepts_extracted"] == 0
+
+
+def test_successful_flush_empties_the_queue(monkeypatch):
+    saved = []
+    monkeypatch.setattr(memory_module, "bulk_save", saved.extend)
+    memory = _memory(["a", "b"], [])
+
+    memory.flush()
+
+    assert saved == ["a", "b"]
+    assert memory._pending_concepts == []
+    assert memory.stats["concepts_extracted"] == 2
@@ -0,0 +1,65 @@
+import numpy as np
+from pymongo.errors import OperationFailure
+
+import models.models as models_module
+from models.models import (
+    Concept,
+    ContentChunk,
+    GeneratedContent,
+    Relationship,
+    SourceDocument,
+    User,
+    _dedupe_relationships,
+    ensure_indexes,
+)
+
+
+def test_get_embedding_reads_float32_bytes():
+    chunk = ContentChunk(document_id="doc", content="text", chunk_index=0)
+    chunk.set_embedding([0.25, -1.5, 3.0])
+
+    assert isinstance(chunk.embedding, bytes)
+    np.testing.assert_array_equal(chunk.get_embedding(), np.array([0.25, -1.5, 3.0], dtype=np.float32))
+
+
+def test_get_embedding_reads_legacy_float_list():
+    concept = Concept(name="concept", embedding=[0.25, -1.5, 3.0])
+
+    embedding = concept.get_embedding()
+
+    assert embedding.dtype == np.float32
+    np.testing.assert_array_equal(embedding, np.array([0.25, -1.5, 3.0], dtype=np.float32))
+
+
+class _RelationshipCollection:
+    def __init__(self, groups):
+        self.groups = groups
+        self.deleted = []
+
+    def aggregate(self, pipeline, **kwargs):
+        return iter(self.groups)
+
+    def delete_many(self, query):
+        self.deleted.extend(query["_id"]["$in"])
+
+
+def test_dedupe_keeps_one_relationship_per_edge(monkeypatch):
+    collection = _RelationshipCollection([{"ids": ["a", "b", "c"], "count": 3}, {"ids": ["d", "e"], "count": 2}])
+    monkeypatch.setattr(Relationship, "_get_collection", lambda: collection)
+
+    _dedupe_relationships()
+
+    assert collection.deleted == ["b", "c", "e"]
+
+
+def test_failed_relationship_index_does_not_stop_startup(monkeypatch):
+    for document_cls in (User, SourceDocument, ContentChunk, GeneratedContent, Concept):
+        monkeypatch.setattr(document_cls, "ensure_indexes", lambda: None)
+    monkeypatch.setattr(models_module, "_dedupe_relationships", lambda: None)
+
+    def fail():
+        raise OperationFailure("E11000 duplicate key error")
+
+    monkeypatch.setattr(Relationship, "ensure_indexes", fail)
+
+    ensure_indexes()
@@ -0,0 +1,62 @@
+import json
+import random
+
+from services.agents.planning_agent import PlanningAgent, PlanningTask, _extract_first_json
+
+
+def test_extract_first_json_skips_surrounding_text():
+    text = 'Here is the plan:\n```json\n{"outline": ["Intro", {"nested": 1}]}\n```\nThen {"other": 2}'
+    assert _extract_first_json(text) == '{"outline": ["Intro", {"nested": 1}]}'
+
+
+def test_extract_first_json_ignores_braces_in_strings():
+    text = 'x {"a": "}{", "b": "say \\"{hi}\\"", "c": {"d": "\\\\"}} y'
+    assert json.loads(_extract_first_json(text)) == {"a": "}{", "b": 'say "{hi}"', "c": {"d": "\\"}}
+
+
+def test_extract_first_json_without_complete_object():
+    assert _extract_first_json("no json here") is None
+    assert _extract_first_json('{"unterminated": {') is None
+
+
+def _random_value(rng: random.Random, depth: int = 0):
+    kind = rng.randrange(5 if depth < 3 else 3)
+    if kind == 0:
+        return rng.randint(-100, 100)
+    if kind == 1:
+        return "".join(rng.choice('ab{}[]"\\ :,') for _ in range(rng.randrange(8)))
+    if kind == 2:
+        return None
+    if kind == 3:
+        return [_random_value(rng, depth + 1) for _ in range(rng.randrange(4))]
+    return {f"k{i}": _random_value(rng, depth + 1) for i in range(rng.randrange(4))}
+
+
+def test_extract_first_json_round_trips_random_objects():
+    rng = random.Random(0)
+    for _ in range(500):
+        obj = {"plan": _random_value(rng)}
+        text = f"Sure! {json.dumps(obj)} trailing {{ noise"
+        assert json.loads(_extract_first_json(text)) == obj
+
+
+def test_plan_cache_key_embeds_only_the_topic():
+    context = [{"id": "doc_chunk_0"}, {"id": "doc_chunk_1"}]
+    beginner = PlanningTask(topic="Python decorators", audience_level="beginner")
+    expert = PlanningTask(topic="Python decorators", audience_level="expert")
+
+    topic, beginner_scope = PlanningAgent._plan_cache_key(beginner, context)
+    _, expert_scope = PlanningAgent._plan_cache_key(expert, context)
+
+    assert topic == "Python decorators"
+    assert beginner_scope != expert_scope
+    assert PlanningAgent._plan_cache_key(PlanningTask(topic="Rust", audience_level="beginner"), context)[1] == beginner_scope
+
+
+def test_plan_cache_key_changes_with_retrieved_context():
+    task = PlanningTask(topic="Python decorators")
+
+    _, before = PlanningAgent._plan_cache_key(task, [{"id": "doc_chunk_0"}])
+    _, after = PlanningAgent._plan_cache_key(task, [{"id": "new_doc_chunk_0"}, {"id": "doc_chunk_0"}])
+
+    assert before != after
@@ -0,0 +1,52 @@
+import asyncio
+import random
+import re
+
+from services.agents.quality_agent import _SENTENCE_RE, QualityAgent, _local_accuracy_score
+
+
+def test_local_accuracy_needs_positive_evidence():
+    assert _local_accuracy_score("Plain explanation of the topic.") is None
+    assert _local_accuracy_score("As documented in the guide.") is None
+
+
+def test_local_accuracy_scores_well_sourced_drafts():
+    assert _local_accuracy_score("As documented in RFC 9110, according to the spec.") == 1.0
+
+
+def test_negative_markers_defer_to_gemini():
+    assert _local_accuracy_score("As documented in RFC 9110. Handle the error case.") is None
+
+
+def test_sentence_count_matches_split_count():
+    rng = random.Random(0)
+    alphabet = [".", "!", "?", " ", "\n", "\t", "a", "b", "xy", " "]
+    for _ in range(20000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+        expected = len([s for s in re.split(r'[.!?]+', text) if s.strip()])
+        assert sum(1 for _ in _SENTENCE_RE.finditer(text)) == expected, repr(text)
+
+
+def test_batch_only_rates_drafts_the_ratings_can_decide():
+    agent = QualityAgent.__new__(QualityAgent)
+    agent.thresholds = {"min_overall": 60}
+    agent.rating_cache = {}
+    # (readability, reading level, completeness, engagement, structure, type compliance) per draft
+    local = {"strong": (100.0, 8.0, 1.0, 1.0, 1.0, 1.0), "weak": (0.0, 20.0, 0.0, 0.0, 0.0, 0.0),
+             "borderline": (70.0, 10.0, 0.8, 0.7, 0.8, 0.8)}
+    agent._assess_text_metrics = lambda content, content_type, word_count: local[content]
+    batched, assessed = [], {}
+
+    async def run_batch_job(prompts):
+        batched.extend(prompts)
+        return ["0.9"] * len(prompts)
+
+    async def process(task, text_metrics=None):
+        assessed[task["content"]] = text_metrics
+
+    agent._run_batch_job = run_batch_job
+    agent.process = process
+    asyncio.run(agent.process_batch([{"content": content} for content in local]))
+
+    assert batched == [agent._consistency_prompt("borderline")]
+    assert assessed == local
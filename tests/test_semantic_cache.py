@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+import services.semantic_cache as semantic_cache
+from services.semantic_cache import SemanticCache, cache_scope
+
+_VECTORS = {
+    "python decorators": np.array([1.0, 0.0, 0.0]),
+    "decorators in python": np.array([0.99, 0.1, 0.0]),
+    "rust lifetimes": np.array([0.0, 1.0, 0.0]),
+}
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(semantic_cache, "time", clock)
+    return clock
+
+
+def _cache(**kwargs) -> SemanticCache:
+    return SemanticCache(lambda text: _VECTORS[text], **kwargs)
+
+
+def test_exact_and_semantic_hits(clock):
+    cache = _cache(threshold=0.95)
+    cache.set("python decorators", "plan")
+
+    assert cache.get("python decorators") == "plan"
+    assert cache.get("decorators in python") == "plan"
+    assert cache.get("rust lifetimes") is None
+    assert cache.stats == {"hits": 2, "semantic_hits": 1, "misses": 1}
+
+
+def test_scopes_never_share_entries(clock):
+    cache = _cache(threshold=0.95)
+    beginner = cache_scope("tutorial", "beginner", {"word_count": 500})
+    expert = cache_scope("tutorial", "expert", {"word_count": 3000})
+    cache.set("python decorators", "beginner plan", beginner)
+
+    assert cache.get("python decorators", beginner) == "beginner plan"
+    assert cache.get("decorators in python", beginner) == "beginner plan"
+    assert cache.get("python decorators", expert) is None
+    assert cache.get("decorators in python", expert) is None
+
+
+def test_cache_scope_ignores_dict_key_order():
+    assert cache_scope({"a": 1, "b": 2}) == cache_scope({"b": 2, "a": 1})
+    assert cache_scope({"a": 1}) != cache_scope({"a": 2})
+
+
+def test_expired_entries_are_not_returned(clock):
+    cache = _cache(threshold=0.95, ttl_seconds=60)
+    cache.set("python decorators", "plan")
+
+    clock.now += 61
+    assert cache.get("python decorators") is None
+    assert cache.get("decorators in python") is None
+
+
+def test_expired_best_match_does_not_hide_a_live_one(clock):
+    cache = _cache(threshold=0.9, ttl_seconds=60)
+    cache.set("decorators in python", "old")
+    clock.now += 30
+    cache.set("python decorators", "new")
+
+    clock.now += 31  # first entry expired, second still live
+    assert cache.get("decorators in python") == "new"
+
+
+def test_oldest_entries_are_evicted_past_max_entries(clock):
+    cache = _cache(threshold=0.999, max_entries=2)
+    for text in _VECTORS:
+        cache.set(text, text)
+        clock.now += 1
+
+    assert cache.get("python decorators") is None
+    assert cache.get("rust lifetimes") == "rust lifetimes"
+    assert len(cache._keys) == len(cache._vectors) == len(cache._scales) == 2
+
+
+def test_int8_similarity_tracks_float_cosine():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 384)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    query = vectors[0] + 0.3 * rng.normal(size=384).astype(np.float32)
+    query /= np.linalg.norm(query)
+
+    rows, scales = zip(*(SemanticCache._quantize(vector) for vector in vectors))
+    quantized = (np.vstack(rows) @ query) * np.concatenate(scales)
+
+    np.testing.assert_allclose(quantized, vectors @ query, atol=0.02)